@@ -21,6 +21,19 @@ class Config:
     BOT_TOKEN = os.getenv("BOT_TOKEN", "")
     BOT_CHAT_ID = os.getenv("BOT_CHAT_ID", "")
     BOT_CHANNEL_ID = os.getenv("BOT_CHANNEL_ID", "")
+    # Additional chats/channels to mirror deliveries into (comma-separated)
+    BOT_EXTRA_TARGETS = [t.strip() for t in os.getenv("BOT_EXTRA_TARGETS", "").split(",") if t.strip()]
+    BOT_MAX_CONCURRENT_SENDS = int(os.getenv("BOT_MAX_CONCURRENT_SENDS", "5"))
+    
+    # Bot HTTP connection pool
+    BOT_HTTP_POOL_SIZE = int(os.getenv("BOT_HTTP_POOL_SIZE", "10"))
+    BOT_HTTP_DNS_CACHE_TTL = int(os.getenv("BOT_HTTP_DNS_CACHE_TTL", "300"))  # seconds
+    BOT_HTTP_KEEPALIVE_TIMEOUT = int(os.getenv("BOT_HTTP_KEEPALIVE_TIMEOUT", "60"))  # seconds
+    
+    # Bot API rate limits (Telegram: ~30 msg/s overall, 1 msg/s per chat, 20 msg/min per group/channel)
+    BOT_GLOBAL_RATE = float(os.getenv("BOT_GLOBAL_RATE", "30"))  # messages per second
+    BOT_PRIVATE_CHAT_RATE = float(os.getenv("BOT_PRIVATE_CHAT_RATE", "1"))  # messages per second
+    BOT_GROUP_RATE_PER_MINUTE = float(os.getenv("BOT_GROUP_RATE_PER_MINUTE", "20"))
     
     # Target Channels
     def _load_target_channels():
@@ -54,10 +67,82 @@ class Config:
     TARGET_CHANNELS = _load_target_channels()
   
     
+    # Channel registration at startup
+    CHANNEL_REGISTRATION_CONCURRENCY = int(os.getenv("CHANNEL_REGISTRATION_CONCURRENCY", "8"))
+    CHANNEL_REGISTRATION_MAX_RETRIES = int(os.getenv("CHANNEL_REGISTRATION_MAX_RETRIES", "3"))  # attempts per channel on FloodWait
+    
+    # Persistent channel entity cache (handle -> id, access_hash, title)
+    ENTITY_CACHE_PATH = os.getenv("ENTITY_CACHE_PATH", "channel_entities.json")
+    ENTITY_CACHE_TTL = int(os.getenv("ENTITY_CACHE_TTL", str(7 * 24 * 3600)))  # seconds before background revalidation
+    
+    # Per-channel pts checkpoints for resuming gap filling after a restart
+    PTS_CHECKPOINT_PATH = os.getenv("PTS_CHECKPOINT_PATH", "pts_checkpoints.json")
+    PTS_CHECKPOINT_INTERVAL = float(os.getenv("PTS_CHECKPOINT_INTERVAL", "5"))  # seconds between batched writes
+    
+    # Gap filling (getChannelDifference polling)
+    GAP_FILL_CONCURRENCY = int(os.getenv("GAP_FILL_CONCURRENCY", "16"))  # requests in flight
+    GAP_FILL_RPC_RATE = float(os.getenv("GAP_FILL_RPC_RATE", "20"))  # requests per second across all channels
+    GAP_POLL_MAX_INTERVAL = float(os.getenv("GAP_POLL_MAX_INTERVAL", "30"))  # backoff cap for quiet channels, seconds
+    CATCHUP_MAX_BACKFILL_HOURS = float(os.getenv("CATCHUP_MAX_BACKFILL_HOURS", "6"))  # history pulled after ChannelDifferenceTooLong
+    
+    # Ingest queue between Telethon callbacks and message processing
+    INGEST_CONSUMERS = int(os.getenv("INGEST_CONSUMERS", "4"))  # channels are sharded over consumers, order kept per channel
+    INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "10000"))
+    INGEST_OVERFLOW_POLICY = os.getenv("INGEST_OVERFLOW_POLICY", "block")  # block, drop_newest or drop_oldest
+    INGEST_REPORT_INTERVAL = float(os.getenv("INGEST_REPORT_INTERVAL", "60"))  # seconds between latency reports
+    
+    # Route live updates through one raw update handler instead of Telethon's event builders
+    RAW_UPDATE_DISPATCH = os.getenv("RAW_UPDATE_DISPATCH", "false").lower() == "true"
+    
+    # Cold-start history backfill (0 disables); shares the gap filling RPC budget
+    BACKFILL_HOURS = float(os.getenv("BACKFILL_HOURS", "0"))
+    BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "8"))  # channels fetched at once
+    
+    # Write-ahead log for the pending batch
+    BATCH_WAL_DIR = os.getenv("BATCH_WAL_DIR", "batch_wal")
+    BATCH_WAL_SEGMENT_BYTES = int(os.getenv("BATCH_WAL_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+    BATCH_WAL_COMMIT_INTERVAL = float(os.getenv("BATCH_WAL_COMMIT_INTERVAL", "0.02"))  # group-commit window, seconds
+    
+    # Exactly-once ingestion: ids tracked below each channel's newest message id
+    SEEN_MESSAGE_WINDOW = int(os.getenv("SEEN_MESSAGE_WINDOW", "4096"))
+    
+    # Near-duplicate story detection
+    DEDUPE_ENABLED = os.getenv("DEDUPE_ENABLED", "true").lower() == "true"
+    DEDUPE_WINDOW_HOURS = float(os.getenv("DEDUPE_WINDOW_HOURS", "24"))
+    DEDUPE_MAX_DISTANCE = int(os.getenv("DEDUPE_MAX_DISTANCE", "6"))  # max SimHash Hamming distance, scaled down for texts under 16 distinct words
+    DEDUPE_CAPACITY = int(os.getenv("DEDUPE_CAPACITY", "65536"))  # fingerprints kept in the window
+    
+    # Burst detection: flush early when a term spikes across channels
+    BURST_DETECTION_ENABLED = os.getenv("BURST_DETECTION_ENABLED", "true").lower() == "true"
+    BURST_WINDOW = float(os.getenv("BURST_WINDOW", "600"))  # seconds
+    BURST_MIN_CHANNELS = int(os.getenv("BURST_MIN_CHANNELS", "3"))
+    BURST_MIN_COUNT = int(os.getenv("BURST_MIN_COUNT", "5"))  # messages in the window
+    BURST_RATIO = float(os.getenv("BURST_RATIO", "5"))  # window count vs. baseline expectation
+    
+    # Watchlist alerts: matching messages skip batching (one term per line)
+    WATCHLIST_PATH = os.getenv("WATCHLIST_PATH", "watchlist.txt")
+    WATCHLIST_RELOAD_INTERVAL = float(os.getenv("WATCHLIST_RELOAD_INTERVAL", "10"))  # seconds between file checks
+    
+    # LLM summarization stage
+    LLM_WORKERS = int(os.getenv("LLM_WORKERS", "2"))
+    LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "4"))  # batches waiting for a worker
+    
+    # Durable outbound delivery queue
+    DELIVERY_QUEUE_PATH = os.getenv("DELIVERY_QUEUE_PATH", "delivery_queue.db")
+    DELIVERY_MAX_ATTEMPTS = int(os.getenv("DELIVERY_MAX_ATTEMPTS", "10"))
+    DELIVERY_RETRY_BASE = float(os.getenv("DELIVERY_RETRY_BASE", "2"))  # seconds
+    DELIVERY_RETRY_MAX = float(os.getenv("DELIVERY_RETRY_MAX", "300"))  # seconds
+    DELIVERY_RETENTION_HOURS = float(os.getenv("DELIVERY_RETENTION_HOURS", "24"))
+    
     # Background task intervals
-    POLLING_INTERVAL = 5
+    POLLING_INTERVAL = 5  # tightest per-channel gap polling interval
     HEARTBEAT_INTERVAL = 840  # 14 minutes
-    BATCH_INTERVAL = 60*60  # 5 minutes in seconds
+    BATCH_INTERVAL = int(os.getenv("BATCH_INTERVAL", str(60*60)))  # max age of the oldest batched message, seconds
+    
+    # Batch flush triggers (whichever comes first; 0 disables a trigger)
+    BATCH_MAX_MESSAGES = int(os.getenv("BATCH_MAX_MESSAGES", "500"))
+    BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", "262144"))
+    BATCH_MAX_TOKENS = int(os.getenv("BATCH_MAX_TOKENS", "60000"))  # estimated LLM input tokens
     
     # File paths
     TRADE_LOG_FILE = "output.jsonl"
@@ -0,0 +1,64 @@
+"""
+Persistent cache of resolved channel entities
+"""
+import time
+from typing import Any, Dict, Optional
+from src.utils.json_file import load_json, save_json_atomic
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class EntityCache:
+    """Map channel handles to (channel id, access_hash, title) across restarts
+
+    access_hash is stable for a given account, so cached entries are used
+    straight away to build InputChannel without a resolve RPC. Entries older
+    than the TTL are still served but flagged stale so the caller can
+    revalidate them in the background. The file is rewritten atomically.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl_seconds
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self._load()
+
+    @staticmethod
+    def key(channel_identifier: str) -> str:
+        """Normalize a handle/link to the cache key"""
+        return channel_identifier.strip().replace('https://t.me/', '').lstrip('@').lower()
+
+    def _load(self) -> None:
+        entries = load_json(self.path, 'entity cache')
+        if entries:
+            self.entries = entries
+            logger.info(f"Loaded {len(self.entries)} cached channel entities from {self.path}")
+
+    def get(self, channel_identifier: str) -> Optional[Dict[str, Any]]:
+        """Cached entry for a handle, or None"""
+        return self.entries.get(self.key(channel_identifier))
+
+    def is_stale(self, entry: Dict[str, Any]) -> bool:
+        """Whether an entry is past its TTL and should be revalidated"""
+        return time.time() - entry.get('resolved_at', 0) > self.ttl
+
+    def put(self, channel_identifier: str, channel_id: int, access_hash: int, title: str) -> None:
+        """Store a freshly resolved entity"""
+        self.entries[self.key(channel_identifier)] = {
+            'id': channel_id,
+            'access_hash': access_hash,
+            'title': title,
+            'resolved_at': time.time()
+        }
+        self.dirty = True
+
+    def drop(self, channel_identifier: str) -> None:
+        """Forget an entry whose access_hash was rejected"""
+        if self.entries.pop(self.key(channel_identifier), None) is not None:
+            self.dirty = True
+
+    def save(self) -> None:
+        """Write the cache to disk if it changed (atomic replace)"""
+        if self.dirty and save_json_atomic(self.path, self.entries, 'entity cache'):
+            self.dirty = False
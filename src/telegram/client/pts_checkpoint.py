@@ -0,0 +1,67 @@
+"""
+Persistent per-channel pts checkpoints
+"""
+from typing import Dict, Optional
+from src.utils.json_file import load_json, save_json_atomic
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class PtsCheckpointStore:
+    """Last processed pts of each channel, kept across restarts
+
+    Next to the pts, each channel keeps the id of the newest message
+    ingested up to that pts, so a catch-up after a long outage knows where
+    ingestion really stopped. update() only changes the in-memory values;
+    flush() writes every change since the previous flush in one atomic
+    replace, so a crash leaves either the old or the new checkpoint file,
+    never a torn one. The caller decides when to flush, which lets it make
+    sure the messages covered by a pts are durable first.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.checkpoints: Dict[int, int] = {}
+        self.message_ids: Dict[int, int] = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        checkpoints = load_json(self.path, 'pts checkpoints')
+        if checkpoints:
+            for channel_id, checkpoint in checkpoints.items():
+                if isinstance(checkpoint, int):
+                    # Written before message ids were tracked
+                    checkpoint = {'pts': checkpoint}
+                self.checkpoints[int(channel_id)] = checkpoint['pts']
+                if checkpoint.get('message_id') is not None:
+                    self.message_ids[int(channel_id)] = checkpoint['message_id']
+            logger.info(f"Loaded pts checkpoints for {len(self.checkpoints)} channels from {self.path}")
+
+    def get(self, channel_id: int) -> Optional[int]:
+        """Checkpointed pts for a channel, or None"""
+        return self.checkpoints.get(channel_id)
+
+    def get_message_id(self, channel_id: int) -> Optional[int]:
+        """Newest message id ingested up to the checkpointed pts, or None"""
+        return self.message_ids.get(channel_id)
+
+    def update(self, channel_id: int, pts: int, message_id: Optional[int] = None) -> None:
+        """Record a channel's new pts, and the newest message id it covers (written on the next flush)"""
+        if self.checkpoints.get(channel_id) != pts:
+            self.checkpoints[channel_id] = pts
+            self.dirty = True
+        if message_id is not None and self.message_ids.get(channel_id) != message_id:
+            self.message_ids[channel_id] = message_id
+            self.dirty = True
+
+    def flush(self) -> None:
+        """Write pending checkpoints to disk (atomic replace)"""
+        if not self.dirty:
+            return
+        data = {
+            str(channel_id): {'pts': pts, 'message_id': self.message_ids.get(channel_id)}
+            for channel_id, pts in self.checkpoints.items()
+        }
+        if save_json_atomic(self.path, data, 'pts checkpoints'):
+            self.dirty = False
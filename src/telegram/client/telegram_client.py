@@ -1,16 +1,23 @@
 """
 Telegram client wrapper
 """
-from telethon import TelegramClient
+import asyncio
+import time
+from telethon import TelegramClient, errors
 from telethon.tl.types import InputChannel, Channel
-from telethon.tl.functions.updates import GetStateRequest
-from typing import Dict, Any, Optional
+from telethon.tl.functions.channels import GetFullChannelRequest
+from typing import Dict, Any, List, Optional, Tuple
 from src.core.config import Config
 from src.core.exceptions import TelegramError
+from src.telegram.client.entity_cache import EntityCache
+from src.telegram.client.pts_checkpoint import PtsCheckpointStore
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Errors meaning a channel's access_hash is no longer accepted for this account
+INVALID_CHANNEL_ERRORS = (errors.ChannelInvalidError, errors.ChannelPrivateError)
+
 class TelegramClientWrapper:
     """Wrapper for Telegram client operations"""
     
@@ -18,12 +25,27 @@ class TelegramClientWrapper:
         logger.info("Initializing Telegram client wrapper...")
         # Use file-based session instead of StringSession
         session_name = getattr(Config, 'TELEGRAM_SESSION_NAME', 'anon')
+        # Callbacks only queue a record, so updates can be dispatched one at a time:
+        # a full ingest queue then holds back Telethon's update loop instead of piling up tasks.
+        # FloodWaits are always raised, never slept inside the call: Telethon would otherwise
+        # hold every later request of the same type, for every channel, until the wait is over
         self.client = TelegramClient(
             session_name,
             Config.TELEGRAM_API_ID,
-            Config.TELEGRAM_API_HASH
+            Config.TELEGRAM_API_HASH,
+            sequential_updates=True,
+            flood_sleep_threshold=0
         )
         self.target_channels = {}
+        self.entity_cache = EntityCache(Config.ENTITY_CACHE_PATH, Config.ENTITY_CACHE_TTL)
+        self.pts_checkpoints = PtsCheckpointStore(Config.PTS_CHECKPOINT_PATH)
+        self._revalidation_tasks = set()
+        self._revalidation_semaphore = asyncio.Semaphore(1)
+        # channel_id -> identifier it was added with, and channels already re-resolved after a rejected hash
+        self._identifiers: Dict[int, str] = {}
+        self._reresolved = set()
+        # Registration phase -> (count, seconds summed over concurrent registrations)
+        self.phase_times: Dict[str, Tuple[int, float]] = {}
         logger.info(f"Telegram client wrapper initialized with session: {session_name}")
     
     async def connect(self) -> None:
@@ -51,50 +73,200 @@ class TelegramClientWrapper:
                 raise TelegramError("Entity is not a channel")
             logger.info(f"Successfully got entity: {entity.title}")
             return entity
+        except errors.FloodWaitError:
+            raise
         except Exception as e:
             logger.error(f"Failed to get entity for {channel_identifier}: {e}")
             raise TelegramError(f"Failed to get entity: {e}")
     
-    async def add_target_channel(self, channel_identifier: str) -> Dict[str, Any]:
-        """Add target channel to monitor"""
+    async def get_channel_pts(self, input_channel: InputChannel) -> int:
+        """Get a channel's current pts (one GetFullChannelRequest)"""
+        full = await self.client(GetFullChannelRequest(input_channel))
+        return full.full_chat.pts
+    
+    async def _resolve(self, channel_identifier: str) -> Tuple[int, str, InputChannel]:
+        """Resolve a channel over the network and cache it"""
+        entity = await self.get_entity(channel_identifier)
+        
+        if entity.access_hash is None:
+            raise TelegramError("Channel access_hash is None")
+        
+        self.entity_cache.put(channel_identifier, entity.id, entity.access_hash, entity.title)
+        return entity.id, entity.title, InputChannel(entity.id, entity.access_hash)
+    
+    def _time_phase(self, phase: str, started: float) -> None:
+        """Add the time since `started` to a registration phase"""
+        count, total = self.phase_times.get(phase, (0, 0.0))
+        self.phase_times[phase] = (count + 1, total + time.perf_counter() - started)
+    
+    def phase_report(self) -> str:
+        """Per-phase registration timings"""
+        parts: List[str] = [
+            f"{phase}: {count} in {total:.2f}s" for phase, (count, total) in self.phase_times.items()
+        ]
+        return ', '.join(parts) or 'no channels registered'
+    
+    async def _initialize_pts(self, channel_id: int, title: str, input_channel: InputChannel) -> int:
+        """Fetch and checkpoint a channel's current pts (0 if it can't be fetched)"""
+        try:
+            logger.info(f"Initializing pts for {title}...")
+            started = time.perf_counter()
+            pts = await self.get_channel_pts(input_channel)
+            self._time_phase('pts init', started)
+            self.pts_checkpoints.update(channel_id, pts)
+            logger.info(f"Initialized pts for {title}: {pts}")
+            return pts
+        except (errors.FloodWaitError, *INVALID_CHANNEL_ERRORS):
+            raise
+        except Exception as e:
+            logger.warning(f"Could not initialize pts for {title}, using 0: {e}")
+            return 0
+    
+    async def add_target_channel(self, channel_identifier: str, pts: Optional[int] = None) -> Dict[str, Any]:
+        """Add target channel to monitor
+        
+        Args:
+            channel_identifier: Channel handle or link
+            pts: Initial pts; defaults to the channel's checkpoint, or its
+                current pts for a channel that was never checkpointed
+        """
         try:
             logger.info(f"Adding target channel: {channel_identifier}")
-            entity = await self.get_entity(channel_identifier)
-            
-            if entity.access_hash is None:
-                raise TelegramError("Channel access_hash is None")
-            
-            input_channel = InputChannel(entity.id, entity.access_hash)
+            started = time.perf_counter()
+            cached = self.entity_cache.get(channel_identifier)
+            if cached is not None:
+                # Build the input channel straight from the cache, no resolve RPC
+                channel_id, title = cached['id'], cached['title']
+                input_channel = InputChannel(channel_id, cached['access_hash'])
+                if self.entity_cache.is_stale(cached):
+                    self._schedule_revalidation(channel_identifier)
+                self._time_phase('cache hit', started)
+            else:
+                channel_id, title, input_channel = await self._resolve(channel_identifier)
+                self._time_phase('resolve', started)
             
             # Extract channel handle
             handle = channel_identifier.replace('@', '').lower()
             
+            # Initialize pts: resume from the checkpoint so gap filling catches up on downtime
+            if pts is None:
+                pts = self.pts_checkpoints.get(channel_id)
+                if pts is not None:
+                    logger.info(f"Resuming {title} from checkpointed pts {pts}")
+            resumed = pts is not None
+            if pts is None:
+                try:
+                    pts = await self._initialize_pts(channel_id, title, input_channel)
+                except INVALID_CHANNEL_ERRORS as e:
+                    if cached is None:
+                        raise
+                    # The cached access_hash was rejected: resolve the channel again, once
+                    logger.warning(f"Cached entity for {channel_identifier} was rejected ({e}), resolving it again")
+                    self.entity_cache.drop(channel_identifier)
+                    started = time.perf_counter()
+                    channel_id, title, input_channel = await self._resolve(channel_identifier)
+                    self._time_phase('resolve', started)
+                    self._reresolved.add(channel_id)
+                    pts = await self._initialize_pts(channel_id, title, input_channel)
+            
             channel_data = {
                 'input_channel': input_channel,
-                'title': entity.title,
+                'title': title,
                 'handle': handle,
-                'pts': 0
+                'pts': pts,
+                # Newest message id ingested up to pts (None until known)
+                'last_message_id': self.pts_checkpoints.get_message_id(channel_id),
+                # Resumed from a known pts: gap filling recovers the downtime, no history backfill needed
+                'resumed': resumed
             }
             
-            self.target_channels[entity.id] = channel_data
-            
-            # Initialize pts
-            try:
-                logger.info(f"Initializing pts for {entity.title}...")
-                state = await self.client(GetStateRequest())
-                self.target_channels[entity.id]['pts'] = state.pts
-                logger.info(f"Initialized pts for {entity.title}: {state.pts}")
-            except Exception as e:
-                logger.warning(f"Could not initialize pts for {entity.title}, using 0: {e}")
-                self.target_channels[entity.id]['pts'] = 0
+            # Registering makes the channel visible to event handlers and gap filling
+            self.target_channels[channel_id] = channel_data
+            self._identifiers[channel_id] = channel_identifier
             
-            logger.info(f"Added target channel: {entity.title} (ID: {entity.id})")
+            logger.info(f"Added target channel: {title} (ID: {channel_id})")
             return channel_data
             
+        except errors.FloodWaitError:
+            raise
         except Exception as e:
             logger.error(f"Failed to add target channel {channel_identifier}: {e}")
             raise TelegramError(f"Failed to add target channel: {e}")
     
+    def _schedule_revalidation(self, channel_identifier: str) -> None:
+        """Re-resolve a stale cache entry in the background"""
+        task = asyncio.create_task(self._revalidate(channel_identifier))
+        self._revalidation_tasks.add(task)
+        task.add_done_callback(self._revalidation_tasks.discard)
+    
+    async def _revalidate(self, channel_identifier: str) -> None:
+        """Refresh a cached entity and update the registered channel if it changed"""
+        # One at a time, to stay clear of ResolveUsername flood limits
+        async with self._revalidation_semaphore:
+            try:
+                entity = await self.get_entity(channel_identifier)
+            except errors.FloodWaitError as e:
+                logger.warning(f"Flood wait while revalidating {channel_identifier}, keeping cached entity: {e.seconds}s")
+                return
+            except Exception as e:
+                logger.warning(f"Could not revalidate cached entity {channel_identifier}: {e}")
+                return
+            
+            if entity.access_hash is None:
+                return
+            
+            self.entity_cache.put(channel_identifier, entity.id, entity.access_hash, entity.title)
+            self.entity_cache.save()
+            
+            channel_data = self.target_channels.get(entity.id)
+            if channel_data is not None:
+                channel_data['input_channel'] = InputChannel(entity.id, entity.access_hash)
+                channel_data['title'] = entity.title
+            logger.info(f"Revalidated cached entity: {entity.title} (ID: {entity.id})")
+    
+    async def reresolve_channel(self, channel_id: int) -> bool:
+        """Re-resolve a registered channel whose cached access_hash was rejected
+        
+        Drops the cache entry and resolves the channel again, at most once per
+        channel. Returns True if the channel now has a fresh input channel.
+        """
+        channel_identifier = self._identifiers.get(channel_id)
+        channel_data = self.target_channels.get(channel_id)
+        if channel_identifier is None or channel_data is None or channel_id in self._reresolved:
+            return False
+        self._reresolved.add(channel_id)
+        
+        logger.warning(f"Access to {channel_data['title']} was rejected, resolving {channel_identifier} again")
+        self.entity_cache.drop(channel_identifier)
+        try:
+            resolved_id, title, input_channel = await self._resolve(channel_identifier)
+        except errors.FloodWaitError as e:
+            # Not a verdict on the channel: allow another attempt later
+            self._reresolved.discard(channel_id)
+            logger.warning(f"Flood wait while re-resolving {channel_identifier}: {e.seconds}s")
+            return False
+        except Exception as e:
+            logger.error(f"Could not re-resolve {channel_identifier}: {e}")
+            self.entity_cache.save()
+            return False
+        self.entity_cache.save()
+        
+        if resolved_id != channel_id:
+            logger.error(f"{channel_identifier} now points to a different channel (ID: {resolved_id}), not switching")
+            return False
+        channel_data['input_channel'] = input_channel
+        channel_data['title'] = title
+        logger.info(f"Re-resolved {title} (ID: {channel_id})")
+        return True
+    
+    def save_entity_cache(self) -> None:
+        """Persist newly resolved entities"""
+        self.entity_cache.save()
+    
+    def get_pts_checkpoints(self) -> PtsCheckpointStore:
+        """Get the per-channel pts checkpoint store"""
+        return self.pts_checkpoints
+    
     def get_client(self) -> TelegramClient:
         """Get the underlying Telegram client"""
         return self.client
@@ -2,12 +2,33 @@
 Event registration and handling
 """
 from telethon import events
-from telethon.tl.types import Message
-from typing import Callable, List, Dict, Any
+from telethon.tl.types import (
+    Message,
+    UpdateDeleteChannelMessages,
+    UpdateEditChannelMessage,
+    UpdateNewChannelMessage,
+)
+from typing import Callable, Container, List, Dict, Any, Optional
+from src.telegram.services.ingest_queue import IngestQueue, IngestRecord
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Raw update type -> ingest record kind, for the fast-path dispatcher
+_RAW_UPDATE_KINDS = {
+    UpdateNewChannelMessage: 'new',
+    UpdateEditChannelMessage: 'edit',
+    UpdateDeleteChannelMessages: 'delete',
+}
+
+def _event_channel_id(event) -> Optional[int]:
+    """Bare channel id an event belongs to (None for non-channel updates)"""
+    channel_id = getattr(event.original_update, 'channel_id', None)
+    if channel_id is None:
+        peer = getattr(getattr(event, 'message', None), 'peer_id', None)
+        channel_id = getattr(peer, 'channel_id', None)
+    return channel_id
+
 class EventHandler:
     """Handle event registration and routing"""
     
@@ -16,6 +37,8 @@ class EventHandler:
         self.message_handlers = []
         self.edit_handlers = []
         self.delete_handlers = []
+        self.live_update_handlers = []
+        self.ingest_queue: Optional[IngestQueue] = None
     
     def register_message_handler(self, handler: Callable) -> None:
         """Register a message handler"""
@@ -29,58 +52,150 @@ class EventHandler:
         """Register a delete handler"""
         self.delete_handlers.append(handler)
     
-    def install_handlers(self, channel_ids: List[int]) -> None:
-        """Install all event handlers"""
+    def register_live_update_handler(self, handler: Callable) -> None:
+        """Register a handler called with (channel_id, pts, pts_count, message_id) after each live update
+        
+        message_id is the new message's id, or None for edits and deletes.
+        """
+        self.live_update_handlers.append(handler)
+    
+    def enable_ingest_queue(self, consumers: int = 4, max_size: int = 10000,
+                            overflow_policy: str = 'block', report_interval: float = 60) -> IngestQueue:
+        """Process updates on a consumer pool instead of inside Telethon's dispatch"""
+        self.ingest_queue = IngestQueue(
+            self._process_record,
+            consumers=consumers,
+            max_size=max_size,
+            overflow_policy=overflow_policy,
+            report_interval=report_interval
+        )
+        return self.ingest_queue
+    
+    async def _dispatch(self, kind: str, event, payload) -> None:
+        """Turn an event into a small record and queue it (or process it inline)"""
+        update = event.original_update
+        await self._submit(IngestRecord(
+            kind,
+            _event_channel_id(event),
+            payload,
+            getattr(update, 'pts', None),
+            getattr(update, 'pts_count', None)
+        ))
+    
+    async def _submit(self, record: IngestRecord) -> None:
+        if self.ingest_queue is None:
+            await self._process_record(record)
+        else:
+            await self.ingest_queue.put(record)
+    
+    async def _process_record(self, record: IngestRecord) -> None:
+        """Run the registered handlers for one update, then report its pts"""
+        channel_id = record.channel_id
+        if record.kind != 'delete' and not isinstance(record.payload, Message):
+            # Service and empty messages (pins, title changes, ...) have nothing for the digest;
+            # the raw dispatcher passes them through so that their pts is still accounted for
+            logger.debug(f"Skipping {type(record.payload).__name__} from channel ID: {channel_id}")
+        elif record.kind == 'new':
+            message = record.payload
+            logger.info(f"📡 EVENT: New message received from channel ID: {channel_id}")
+            logger.info(f"📨 Message content preview: {message.message[:100] if message.message else 'No text'}...")
+            for handler in self.message_handlers:
+                await handler(message, channel_id)
+        elif record.kind == 'edit':
+            message = record.payload
+            logger.info(f"✏️ EVENT: Message edited in channel ID: {channel_id}")
+            logger.info(f"📝 Edited content: {message.message[:100] if message.message else 'No text'}...")
+            for handler in self.edit_handlers:
+                await handler(message, channel_id, is_edit=True)
+        else:
+            logger.info(f"🗑️ EVENT: Messages deleted in channel ID: {channel_id}")
+            logger.info(f"🗑️ Deleted message IDs: {record.payload}")
+            for handler in self.delete_handlers:
+                await handler(record.payload, channel_id)
+        
+        message_id = record.payload.id if record.kind == 'new' else None
+        for handler in self.live_update_handlers:
+            handler(channel_id, record.pts, record.pts_count, message_id)
+    
+    def install_handlers(self, channel_ids: Container[int]) -> None:
+        """Install all event handlers
+        
+        Args:
+            channel_ids: Channel ids to accept. Membership is checked per update,
+                so a live dict/set lets channels start flowing as soon as they
+                are registered.
+        """
         if not self.client:
             raise ValueError("Client not initialized")
         
-        # Universal message handler
-        @self.client.on(events.NewMessage(chats=channel_ids))
+        def is_target(event) -> bool:
+            return _event_channel_id(event) in channel_ids
+        
+        # Callbacks only queue a record; processing happens on the ingest consumers
+        @self.client.on(events.NewMessage(func=is_target))
         async def universal_message_handler(event):
             """Handle all new messages"""
-            print(event)
-            message = event.message
-            logger.info(f"🔥 INCOMING MESSAGE DETECTED: Channel {message.peer_id.channel_id} - Content: {message.message[:50] if message.message else 'No text'}")
             try:
-                channel_id = message.peer_id.channel_id
-                logger.info(f"📡 EVENT: New message received from channel ID: {channel_id}")
-                logger.info(f"📨 Message content preview: {message.message[:100] if message.message else 'No text'}...")
-                
-                for handler in self.message_handlers:
-                    await handler(message, channel_id)
-                    
+                await self._dispatch('new', event, event.message)
             except Exception as e:
                 logger.error(f"❌ Error in message handler: {e}")
         
         # Edit message handler
-        @self.client.on(events.MessageEdited(chats=channel_ids))
+        @self.client.on(events.MessageEdited(func=is_target))
         async def edited_message_handler(event):
             """Handle edited messages"""
-            message = event.message
             try:
-                channel_id = message.peer_id.channel_id
-                logger.info(f"✏️ EVENT: Message edited in channel ID: {channel_id}")
-                logger.info(f"📝 Edited content: {message.message[:100] if message.message else 'No text'}...")
-                
-                for handler in self.edit_handlers:
-                    await handler(message, channel_id, is_edit=True)
-                    
+                await self._dispatch('edit', event, event.message)
             except Exception as e:
                 logger.error(f"❌ Error in edit handler: {e}")
         
         # Delete message handler
-        @self.client.on(events.MessageDeleted(chats=channel_ids))
+        @self.client.on(events.MessageDeleted(func=is_target))
         async def deleted_message_handler(event):
             """Handle deleted messages"""
             try:
-                channel_id = event.chat_id
-                logger.info(f"🗑️ EVENT: Messages deleted in channel ID: {channel_id}")
-                logger.info(f"🗑️ Deleted message IDs: {event.deleted_ids}")
-                
-                for handler in self.delete_handlers:
-                    await handler(event.deleted_ids, channel_id)
-                    
+                await self._dispatch('delete', event, event.deleted_ids)
             except Exception as e:
                 logger.error(f"❌ Error in delete handler: {e}")
         
-        logger.info("Event handlers installed successfully") 
\ No newline at end of file
+        logger.info("Event handlers installed successfully")
+    
+    def install_raw_handlers(self, channel_ids: Container[int]) -> None:
+        """Install a single raw update handler instead of the event builders
+        
+        Telethon wraps every update in an event object and runs its chat
+        filter before our callback sees it. Here each raw update costs one
+        dict lookup on its type and one membership check on its channel id;
+        only updates from target channels are turned into ingest records,
+        straight from the update's message. Service messages are skipped at
+        processing time, as events.NewMessage would, but still advance the pts.
+        
+        Args:
+            channel_ids: Channel ids to accept (a live dict/set, as for
+                install_handlers)
+        """
+        if not self.client:
+            raise ValueError("Client not initialized")
+        
+        kinds = _RAW_UPDATE_KINDS
+        
+        @self.client.on(events.Raw)
+        async def raw_update_handler(update):
+            """Route channel message updates from target channels"""
+            kind = kinds.get(type(update))
+            if kind is None:
+                return
+            if kind == 'delete':
+                channel_id = update.channel_id
+                payload = update.messages
+            else:
+                payload = update.message
+                channel_id = getattr(getattr(payload, 'peer_id', None), 'channel_id', None)
+            if channel_id not in channel_ids:
+                return
+            try:
+                await self._submit(IngestRecord(kind, channel_id, payload, update.pts, update.pts_count))
+            except Exception as e:
+                logger.error(f"❌ Error in raw update handler: {e}")
+        
+        logger.info("Raw update dispatcher installed successfully") 
\ No newline at end of file
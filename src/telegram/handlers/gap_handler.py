@@ -2,56 +2,306 @@
 Gap filling logic for missed updates
 """
 import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+from telethon.tl.functions.messages import GetHistoryRequest
 from telethon.tl.functions.updates import GetChannelDifferenceRequest
-from telethon.tl.types import ChannelMessagesFilterEmpty
+from telethon.tl.types import ChannelMessagesFilterEmpty, InputPeerChannel
 from telethon import errors, types
-from typing import Dict, Any
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+from src.telegram.client.telegram_client import INVALID_CHANNEL_ERRORS
 from src.utils.logger import get_logger
+from src.utils.rate_limit import AsyncRateLimiter
 
 logger = get_logger(__name__)
 
 class GapHandler:
-    """Handle gap filling for missed updates"""
+    """Handle gap filling for missed updates
     
-    def __init__(self, client, target_channels: Dict[int, Dict[str, Any]]):
+    Each channel has its own polling cadence, kept in a heap by next-due time.
+    Empty differences double the interval (up to max_interval), a difference
+    that turns up missed messages resets it to min_interval, and the server's
+    `timeout` hint is never undercut. Channels whose live updates arrived
+    recently are skipped: live updates advance the channel pts, and a pts
+    jump in a live update (updates were missed) makes the channel due at
+    once. Each due channel is polled in its own task, at most `concurrency`
+    at a time and `rpc_rate` requests per second across all of them, so a
+    slow channel (a long backfill, a FloodWait) never holds up the next poll
+    of the others. A FloodWait only delays the channel that hit it; this
+    relies on the client raising FloodWaits instead of sleeping on them
+    (`flood_sleep_threshold=0`).
+    
+    A poll is a full catch-up: differences are paged until `final`. When the
+    server answers ChannelDifferenceTooLong, the missing range is pulled with
+    GetHistory instead and fed to the ingest path oldest first. The range
+    starts after the channel's `last_message_id`, the newest message ingested
+    up to its pts (checkpointed with it), and runs to the newest message;
+    messages that already arrived live are dropped by the ingest path's
+    seen-set. It never reaches further back than `max_backfill` seconds.
+    
+    When the server rejects a channel's access_hash, `on_invalid_channel` is
+    asked to resolve it again; if it does, the channel is polled straight away.
+    """
+    
+    def __init__(self, client, target_channels: Dict[int, Dict[str, Any]], checkpoints=None,
+                 concurrency: int = 16, rpc_rate: float = 20,
+                 min_interval: float = 5, max_interval: float = 30,
+                 max_backfill: float = 6 * 3600,
+                 on_invalid_channel: Optional[Callable[[int], Awaitable[bool]]] = None):
         self.client = client
         self.target_channels = target_channels
+        # PtsCheckpointStore; advanced only after a difference's messages were processed
+        self.checkpoints = checkpoints
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.rate_limiter = AsyncRateLimiter(rpc_rate, burst=concurrency)
+        
+        # Polling schedule: heap of (due time, channel_id); stale entries are skipped lazily
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.schedule: List[Tuple[float, int]] = []
+        self.next_due: Dict[int, float] = {}
+        self.intervals: Dict[int, float] = {}
+        self.last_live_update: Dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+        # channel_id -> its poll in progress; the poll schedules the next one when it ends
+        self.polls: Dict[int, asyncio.Task] = {}
+        
+        # Catch-up after TooLong
+        self.max_backfill = max_backfill
+        self.on_invalid_channel = on_invalid_channel
+        
+        # Statistics
+        self.rpc_count = 0
+        self.skipped_live = 0
+        self.recovered = 0
+    
+    def _advance_pts(self, channel_id: int, pts: Optional[int], message_id: Optional[int] = None) -> None:
+        """Move a channel's pts forward and record the checkpoint
+        
+        message_id is the newest message ingested up to pts; it only moves
+        together with the pts, so it always marks where contiguous ingestion
+        stopped.
+        """
+        channel_data = self.target_channels.get(channel_id)
+        if pts is None or channel_data is None or pts <= channel_data['pts']:
+            return
+        channel_data['pts'] = pts
+        if message_id is not None and message_id > (channel_data.get('last_message_id') or 0):
+            channel_data['last_message_id'] = message_id
+        if self.checkpoints is not None:
+            self.checkpoints.update(channel_id, pts, channel_data.get('last_message_id'))
     
-    async def fill_gap(self) -> None:
-        """Fill gaps in updates using getChannelDifference for all channels"""
+    def _schedule(self, channel_id: int, delay: float) -> None:
+        """Make a channel due `delay` seconds from now"""
+        due = time.monotonic() + max(0.0, delay)
+        self.next_due[channel_id] = due
+        heapq.heappush(self.schedule, (due, channel_id))
+        if delay <= 0:
+            self._wakeup.set()
+    
+    def note_live_update(self, channel_id: int, pts: Optional[int], pts_count: Optional[int],
+                         message_id: Optional[int] = None) -> None:
+        """Account for an update delivered live, after it was processed
+        
+        message_id is set for new messages only.
+        """
+        channel_data = self.target_channels.get(channel_id)
+        if channel_data is None:
+            return
+        self.last_live_update[channel_id] = time.monotonic()
+        if pts is None:
+            return
+        
+        expected = channel_data['pts'] + (pts_count or 0)
+        if pts == expected:
+            self._advance_pts(channel_id, pts, message_id)
+        elif pts > expected:
+            # Updates between our pts and this one never arrived: poll right away
+            logger.info(f"Gap detected in live updates for {channel_data['title']} (pts {channel_data['pts']} -> {pts}), polling now")
+            self.last_live_update.pop(channel_id, None)
+            self.intervals[channel_id] = self.min_interval
+            self._schedule(channel_id, 0)
+    
+    def seconds_until_due(self) -> float:
+        """Time until the next channel is due (0 if one is due now)"""
+        if len(self.next_due) < len(self.target_channels):
+            # Newly registered channels are polled straight away
+            return 0.0
+        if not self.schedule:
+            return self.min_interval
+        return max(0.0, self.schedule[0][0] - time.monotonic())
+    
+    async def wait_until_due(self, max_wait: float) -> None:
+        """Sleep until a channel is due, a gap is detected, or max_wait passes"""
+        self._wakeup.clear()
+        delay = min(max_wait, self.seconds_until_due())
+        if delay <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+    
+    def fill_gap(self) -> None:
+        """Start a getChannelDifference poll for every channel that is due"""
         if not self.client or not self.target_channels:
             return
         
-        for channel_id, channel_data in self.target_channels.items():
+        # Channels registered since the last sweep are polled straight away
+        for channel_id in list(self.target_channels):
+            if channel_id not in self.next_due:
+                self.intervals[channel_id] = self.min_interval
+                self._schedule(channel_id, 0)
+        
+        now = time.monotonic()
+        due = []
+        skipped = 0
+        while self.schedule and self.schedule[0][0] <= now:
+            due_at, channel_id = heapq.heappop(self.schedule)
+            if self.next_due.get(channel_id) != due_at or channel_id in self.polls:
+                # Stale entry, or the channel is being polled and reschedules itself when done
+                continue
+            interval = self.intervals[channel_id]
+            last_live = self.last_live_update.get(channel_id)
+            if last_live is not None and now - last_live < interval:
+                # Live updates are flowing and their pts is contiguous; look again later
+                self._schedule(channel_id, last_live + interval - now)
+                skipped += 1
+                continue
+            due.append(channel_id)
+        
+        if not due:
+            self.skipped_live += skipped
+            return
+        
+        for channel_id in due:
+            task = asyncio.create_task(self.fill_channel_gap(channel_id, self.target_channels[channel_id]))
+            self.polls[channel_id] = task
+            task.add_done_callback(lambda _, channel_id=channel_id: self.polls.pop(channel_id, None))
+        self.skipped_live += skipped
+        logger.debug(
+            f"Gap fill: started {len(due)} polls, {len(self.polls)} in progress "
+            f"({skipped} skipped with live updates; totals: {self.rpc_count} requests, {self.skipped_live} skipped)"
+        )
+    
+    def cancel_polls(self) -> None:
+        """Cancel the polls in progress (shutdown)"""
+        for task in self.polls.values():
+            task.cancel()
+    
+    async def _get_difference(self, channel_data: Dict[str, Any]):
+        """One getChannelDifference page from the channel's current pts"""
+        await self.rate_limiter.acquire()
+        self.rpc_count += 1
+        return await self.client(GetChannelDifferenceRequest(
+            channel=channel_data['input_channel'],
+            filter=ChannelMessagesFilterEmpty(),
+            pts=channel_data['pts'],
+            limit=100
+        ))
+    
+    async def backfill_history(self, channel_id: int, channel_data: Dict[str, Any]) -> int:
+        """Pull the messages a TooLong difference skipped over; returns how many were ingested"""
+        input_channel = channel_data['input_channel']
+        peer = InputPeerChannel(input_channel.channel_id, input_channel.access_hash)
+        # Everything after the last contiguously ingested message, up to the newest
+        min_id = channel_data.get('last_message_id') or 0
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.max_backfill)
+        
+        # History comes newest first; collect the whole range, then ingest oldest first
+        collected = []
+        offset_id = 0
+        while True:
+            await self.rate_limiter.acquire()
+            self.rpc_count += 1
+            history = await self.client(GetHistoryRequest(
+                peer=peer,
+                offset_id=offset_id,
+                offset_date=None,
+                add_offset=0,
+                limit=100,
+                max_id=0,
+                min_id=min_id,
+                hash=0
+            ))
+            page = history.messages
+            in_window = [message for message in page if getattr(message, 'date', None) is None or message.date >= cutoff]
+            collected.extend(in_window)
+            if len(page) < 100 or len(in_window) < len(page):
+                break
+            offset_id = page[-1].id
+        
+        if collected and min_id == 0:
+            logger.info(f"No ingested messages known for {channel_data['title']}, backfilled the last {self.max_backfill / 3600:g}h")
+        for message in reversed(collected):
+            await self.process_gap_message(message, channel_data['title'])
+        return len(collected)
+    
+    async def fill_channel_gap(self, channel_id: int, channel_data: Dict[str, Any]) -> None:
+        """Catch one channel up to the server's state, then schedule its next poll"""
+        interval = self.intervals.get(channel_id, self.min_interval)
+        delay = interval
+        started = time.perf_counter()
+        recovered = 0
+        async with self.semaphore:
             try:
-                diff = await self.client(GetChannelDifferenceRequest(
-                    channel=channel_data['input_channel'],
-                    filter=ChannelMessagesFilterEmpty(),
-                    pts=channel_data['pts'],
-                    limit=100
-                ))
-                
-                if isinstance(diff, types.updates.ChannelDifference):
-                    logger.info(f"Filling gap for {channel_data['title']}: {len(diff.new_messages)} new messages")
-                    for message in diff.new_messages:
-                        # Process message through registered handlers
-                        await self.process_gap_message(message, channel_data['title'])
+                while True:
+                    diff = await self._get_difference(channel_data)
                     
-                    self.target_channels[channel_id]['pts'] = diff.pts
-                
-                elif isinstance(diff, types.updates.ChannelDifferenceTooLong):
-                    logger.warning(f"Gap too long for {channel_data['title']}, refreshing dialog state")
-                    dialog = diff.dialog
-                    # Use getattr to safely access pts attribute
-                    pts = getattr(dialog, 'pts', None)
-                    if pts is not None:
-                        self.target_channels[channel_id]['pts'] = pts
+                    if isinstance(diff, types.updates.ChannelDifference):
+                        logger.info(f"Filling gap for {channel_data['title']}: {len(diff.new_messages)} new messages")
+                        for message in diff.new_messages:
+                            # Process message through registered handlers
+                            await self.process_gap_message(message, channel_data['title'])
+                        recovered += len(diff.new_messages)
+                        
+                        newest = max((message.id for message in diff.new_messages), default=None)
+                        self._advance_pts(channel_id, diff.pts, newest)
+                        if diff.new_messages:
+                            # Live updates missed these; poll this channel closely again
+                            interval = self.min_interval
+                        if not diff.final:
+                            continue
+                        delay = interval
+                    
+                    elif isinstance(diff, types.updates.ChannelDifferenceTooLong):
+                        logger.warning(f"Gap too long for {channel_data['title']}, backfilling from history")
+                        recovered += await self.backfill_history(channel_id, channel_data)
+                        dialog = diff.dialog
+                        # Use getattr to safely access pts attribute
+                        self._advance_pts(channel_id, getattr(dialog, 'pts', None), getattr(dialog, 'top_message', None))
+                        interval = delay = self.min_interval
+                    
+                    else:
+                        # Nothing new: back off
+                        interval = delay = min(self.max_interval, interval * 2)
+                    
+                    # Never poll sooner than the server asked us to
+                    delay = max(delay, getattr(diff, 'timeout', None) or 0)
+                    break
                 
             except errors.FloodWaitError as e:
-                logger.warning(f"Flood wait for {channel_data['title']}: {e.seconds} seconds")
-                await asyncio.sleep(e.seconds)
+                # Delay only this channel instead of stalling the whole sweep
+                delay = max(delay, e.seconds)
+                logger.warning(f"Flood wait for {channel_data['title']}: next poll in {e.seconds} seconds")
+            except INVALID_CHANNEL_ERRORS as e:
+                if self.on_invalid_channel is not None and await self.on_invalid_channel(channel_id):
+                    delay = 0
+                else:
+                    logger.error(f"Gap filling failed for {channel_data['title']}, channel access was rejected: {e}")
             except Exception as e:
                 logger.error(f"Gap filling failed for {channel_data['title']}: {e}")
+            finally:
+                self.intervals[channel_id] = interval
+                self._schedule(channel_id, delay)
+                if recovered:
+                    elapsed = time.perf_counter() - started
+                    self.recovered += recovered
+                    logger.info(
+                        f"🩹 Recovered {recovered} messages for {channel_data['title']} in {elapsed:.2f}s "
+                        f"({recovered / max(elapsed, 1e-6):.0f} msg/s, {self.recovered} recovered in total)"
+                    )
     
     async def process_gap_message(self, message, channel_title: str) -> None:
         """Process a message from gap filling"""
@@ -2,8 +2,9 @@
 Message processing handler
 """
 from telethon.tl.types import Message
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from src.core.base_classes import BaseMessageHandler
+from src.utils.address_extractor import AddressExtractor, ExtractedSymbols
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -13,6 +14,7 @@ class MessageHandler(BaseMessageHandler):
     
     def __init__(self):
         super().__init__()
+        self.address_extractor = AddressExtractor()
     
     async def process_message(self, message: Message, channel_title: str) -> Dict[str, Any] | None:
         """Process a message and extract relevant information"""
@@ -24,25 +26,50 @@ class MessageHandler(BaseMessageHandler):
             logger.info(f"Message type: {message_type}")
             logger.info(f"Content: {message.message[:200]}...")
             
-            # Extract Solana addresses
-            solana_addresses = self.address_extractor.extract_solana_addresses(message.message)
-            
-            if solana_addresses:
-                logger.info(f"Solana addresses found: {solana_addresses}")
-                return {
-                    'addresses': solana_addresses,
-                    'message_info': message_info,
-                    'channel_title': channel_title,
-                    'message_text': message.message,
-                    'message_date': message.date
-                }
-            
-            return None
+            # Extract Solana/EVM addresses and cashtags
+            symbols = self.address_extractor.extract(message.message)
+            return self._build_result(message, channel_title, message_info, symbols)
             
         except Exception as e:
             logger.error(f"Error processing message: {e}")
             return None
     
+    async def process_messages(self, messages: List[Tuple[Message, str]]) -> List[Dict[str, Any]]:
+        """Process a batch of (message, channel_title) pairs; returns results for messages with symbols"""
+        try:
+            symbols_list = self.address_extractor.extract_batch(message.message for message, _ in messages)
+            results = []
+            for (message, channel_title), symbols in zip(messages, symbols_list):
+                if symbols:
+                    result = self._build_result(message, channel_title, self.get_detailed_message_info(message), symbols)
+                    results.append(result)
+            return results
+        except Exception as e:
+            logger.error(f"Error processing message batch: {e}")
+            return []
+    
+    def _build_result(self, message: Message, channel_title: str, message_info: Dict[str, Any],
+                      symbols: ExtractedSymbols) -> Optional[Dict[str, Any]]:
+        """Result dict for a message with extracted symbols, or None if it has none"""
+        if not symbols:
+            return None
+        
+        if symbols.solana:
+            logger.info(f"Solana addresses found: {symbols.solana}")
+        if symbols.evm:
+            logger.info(f"EVM addresses found: {symbols.evm}")
+        if symbols.tickers:
+            logger.info(f"Tickers found: {symbols.tickers}")
+        return {
+            'addresses': symbols.solana,
+            'evm_addresses': symbols.evm,
+            'tickers': symbols.tickers,
+            'message_info': message_info,
+            'channel_title': channel_title,
+            'message_text': message.message,
+            'message_date': message.date
+        }
+    
     def get_detailed_message_info(self, message: Message) -> Dict[str, Any]:
         """Get detailed information about a message"""
         info = {
@@ -0,0 +1,89 @@
+"""
+Flush triggers for the message batch
+"""
+import asyncio
+from typing import Iterable, Optional
+
+# Rough chars-per-token ratio for English news text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+class BatchFlushController:
+    """Signal a batch flush on whichever limit is reached first
+
+    Limits are message count, accumulated UTF-8 bytes, estimated LLM tokens
+    and the age of the oldest pending message. A limit of 0 disables that
+    trigger. The batch processor awaits wait() instead of polling the clock.
+    """
+
+    def __init__(self, max_messages: int = 0, max_bytes: int = 0, max_tokens: int = 0, max_age: float = 0):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.max_age = max_age
+
+        self.message_count = 0
+        self.byte_count = 0
+        self.token_estimate = 0
+        self.first_message_at: Optional[float] = None
+        self.reason: Optional[str] = None
+        self._changed = asyncio.Event()
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Cheap token estimate (no tokenizer round trip)"""
+        return len(text) // CHARS_PER_TOKEN + 1
+
+    def record(self, text: str, urls: Iterable[str] = ()) -> None:
+        """Account for a message added to the batch and fire any size trigger"""
+        payload = (text or '') + ''.join(urls)
+        self.message_count += 1
+        self.byte_count += len(payload.encode('utf-8'))
+        self.token_estimate += self.estimate_tokens(payload)
+
+        if self.first_message_at is None:
+            self.first_message_at = asyncio.get_running_loop().time()
+            self._changed.set()
+
+        if self.reason is None:
+            if self.max_messages and self.message_count >= self.max_messages:
+                self.reason = f"message count ({self.message_count})"
+            elif self.max_bytes and self.byte_count >= self.max_bytes:
+                self.reason = f"size ({self.byte_count} bytes)"
+            elif self.max_tokens and self.token_estimate >= self.max_tokens:
+                self.reason = f"token estimate (~{self.token_estimate} tokens)"
+            if self.reason:
+                self._changed.set()
+
+    def trigger(self, reason: str) -> None:
+        """Request an immediate flush"""
+        if self.reason is None:
+            self.reason = reason
+        self._changed.set()
+
+    def reset(self) -> None:
+        """Clear counters after the batch has been taken"""
+        self.message_count = 0
+        self.byte_count = 0
+        self.token_estimate = 0
+        self.first_message_at = None
+        self.reason = None
+
+    async def wait(self) -> str:
+        """Wait until a trigger fires and return its reason"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._changed.clear()
+            if self.reason is not None:
+                return self.reason
+
+            timeout = None
+            if self.max_age and self.first_message_at is not None:
+                timeout = self.first_message_at + self.max_age - loop.time()
+                if timeout <= 0:
+                    self.reason = f"age ({self.max_age:.0f}s)"
+                    return self.reason
+
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
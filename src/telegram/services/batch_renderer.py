@@ -0,0 +1,191 @@
+"""
+Batch rendering for forwarded messages and LLM input
+"""
+import html
+import re
+from typing import Dict, Iterator, List, Tuple
+from src.telegram.services.batched_message import BatchedMessage
+from src.utils.url_extractor import canonicalize_url
+
+# Telegram rejects sendMessage text longer than this
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+_TAG_RE = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9-]*)[^>]*>')
+_TOKEN_RE = re.compile(r'<[^>]*>|&#?\w+;|\s+|[^<&\s]+|[<&]')
+
+def _apply_tags(open_tags: List[Tuple[str, str]], fragment: str) -> List[Tuple[str, str]]:
+    """Return the open tag stack after the tags in fragment"""
+    if '<' not in fragment:
+        return open_tags
+
+    tags = list(open_tags)
+    for match in _TAG_RE.finditer(fragment):
+        name = match.group(2).lower()
+        if not match.group(1):
+            tags.append((name, match.group(0)))
+            continue
+
+        for i in range(len(tags) - 1, -1, -1):
+            if tags[i][0] == name:
+                del tags[i]
+                break
+    return tags
+
+def _closing(open_tags: List[Tuple[str, str]]) -> str:
+    return ''.join(f'</{name}>' for name, _ in reversed(open_tags))
+
+def utf16_len(text: str) -> int:
+    """Length of text as Telegram counts it, in UTF-16 code units"""
+    return len(text.encode('utf-16-le')) // 2
+
+def _utf16_prefix(text: str, units: int) -> str:
+    """Longest prefix of text within `units` UTF-16 code units (at least one character)"""
+    prefix = text.encode('utf-16-le')[:units * 2].decode('utf-16-le', errors='ignore')
+    return prefix or text[:1]
+
+def split_html(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """Split Telegram HTML into chunks of at most limit UTF-16 code units
+
+    Splits prefer line boundaries, then whitespace. Tags left open at a split
+    are closed at the end of the chunk and reopened at the start of the next,
+    and tags/entities are never cut in half. A line that would start a chunk
+    while the current one is under a quarter full, or that is too long for
+    any chunk, is split inside instead, so headers and prefixes are never
+    sent as messages of their own.
+    """
+    if utf16_len(text) <= limit:
+        return [text] if text else []
+
+    min_fill = limit // 4
+    chunks = []
+    parts = []
+    size = 0
+    open_tags: List[Tuple[str, str]] = []
+
+    def flush() -> None:
+        nonlocal parts, size
+        body = ''.join(parts)
+        if not _TAG_RE.sub('', body).strip():
+            # Nothing but markup so far: keep it for the next chunk
+            return
+        chunks.append(body + _closing(open_tags))
+        reopen = ''.join(raw for _, raw in open_tags)
+        parts = [reopen] if reopen else []
+        size = utf16_len(reopen)
+
+    def append(fragment: str, tags_after: List[Tuple[str, str]]) -> None:
+        nonlocal size, open_tags
+        parts.append(fragment)
+        size += utf16_len(fragment)
+        open_tags = tags_after
+
+    def fits_alone(fragment: str, tags_after: List[Tuple[str, str]]) -> bool:
+        reopen = utf16_len(''.join(raw for _, raw in open_tags))
+        return reopen + utf16_len(fragment) + utf16_len(_closing(tags_after)) <= limit
+
+    for line in text.splitlines(keepends=True):
+        tags_after = _apply_tags(open_tags, line)
+        if size + utf16_len(line) + utf16_len(_closing(tags_after)) <= limit:
+            append(line, tags_after)
+            continue
+
+        # Line doesn't fit: break before it, unless that leaves a tiny chunk behind
+        if size >= min_fill and fits_alone(line, tags_after):
+            flush()
+            if size + utf16_len(line) + utf16_len(_closing(tags_after)) <= limit:
+                append(line, tags_after)
+                continue
+
+        # Fall back to token level, topping up the current chunk first
+        for token in _TOKEN_RE.findall(line):
+            tags_after = _apply_tags(open_tags, token)
+            markup = token.startswith(('<', '&'))
+            if size + utf16_len(token) + utf16_len(_closing(tags_after)) > limit and (markup or fits_alone(token, tags_after)):
+                flush()
+
+            # Oversized plain-text run: hard-cut it
+            while size + utf16_len(token) + utf16_len(_closing(open_tags)) > limit and not markup:
+                piece = _utf16_prefix(token, max(1, limit - size - utf16_len(_closing(open_tags))))
+                append(piece, open_tags)
+                flush()
+                token = token[len(piece):]
+
+            append(token, _apply_tags(open_tags, token))
+
+    flush()
+    return chunks
+
+class BatchRenderer:
+    """Render a message batch in one pass into forwarded chunks and LLM input text"""
+
+    def __init__(self, batch_messages: List[BatchedMessage], limit: int = TELEGRAM_MESSAGE_LIMIT):
+        self.batch_messages = batch_messages
+        self.limit = limit
+        self.url_count = 0
+        self._llm_parts: List[str] = []
+        self._done = False
+
+    def iter_forward_chunks(self) -> Iterator[str]:
+        """Yield HTML chunks of the forwarded view as soon as each one is full
+
+        The LLM view is built alongside and is available from llm_text once
+        the iterator is exhausted.
+        """
+        llm_parts = ["Batched Messages:\n\n"]
+        parts = [f"<b>Batched {len(self.batch_messages)} messages:</b>\n\n"]
+        size = utf16_len(parts[0])
+        min_fill = self.limit // 4
+        # Canonical form -> the URL as first written
+        all_urls: Dict[str, str] = {}
+
+        def add_block(block: str) -> Iterator[str]:
+            nonlocal parts, size
+            block_size = utf16_len(block)
+            if size + block_size <= self.limit:
+                parts.append(block)
+                size += block_size
+            elif block_size <= self.limit and size >= min_fill:
+                # Break at the message boundary
+                yield ''.join(parts)
+                parts, size = [block], block_size
+            else:
+                # Oversized block, or a nearly empty chunk: fill the current chunk, then split inside the block
+                *head, tail = split_html(''.join(parts) + block, self.limit)
+                yield from head
+                parts, size = [tail], utf16_len(tail)
+
+        for i, msg in enumerate(self.batch_messages, 1):
+            # Merged near-duplicates list every source channel
+            channel = ', @'.join(msg.source_handles)
+            text = msg.text or ''
+            urls = msg.urls
+
+            llm_parts.append(f"{i}. @{channel}: {text}\n")
+            if urls:
+                llm_parts.append(f"   Links: {', '.join(urls)}\n")
+                for url in urls:
+                    all_urls.setdefault(canonicalize_url(url), url)
+            llm_parts.append("\n")
+
+            yield from add_block(f"{i}. @{html.escape(channel)}: {html.escape(text)}\n\n")
+
+        self._llm_parts = llm_parts
+        self.url_count = len(all_urls)
+        self._done = True
+
+        # Links section
+        if all_urls:
+            yield from add_block(f"🔗 <b>Links ({len(all_urls)}):</b>\n")
+            for url in all_urls.values():
+                yield from add_block(f"• {html.escape(url)}\n")
+
+        if parts:
+            yield ''.join(parts)
+
+    @property
+    def llm_text(self) -> str:
+        """Plain-text view of the batch for the LLM prompt"""
+        if not self._done:
+            for _ in self.iter_forward_chunks():
+                pass
+        return ''.join(self._llm_parts)
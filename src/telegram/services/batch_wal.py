@@ -0,0 +1,216 @@
+"""
+Write-ahead log for the in-memory message batch
+"""
+import asyncio
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from src.telegram.services.batched_message import BatchedMessage
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Record header: payload length, CRC32 of payload
+_HEADER = struct.Struct('<II')
+_SEGMENT_PREFIX = 'segment-'
+_SEGMENT_SUFFIX = '.log'
+
+def _frame(data: dict) -> bytes:
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+def _encode(message: BatchedMessage) -> bytes:
+    return _frame({
+        'id': message.message_id,
+        'ch': message.channel_id,
+        'h': message.channel_handle,
+        't': message.text,
+        'u': list(message.urls),
+        'd': message.date.isoformat() if message.date else None,
+    })
+
+def _encode_delete(channel_id: int, message_id: int) -> bytes:
+    return _frame({'id': message_id, 'ch': channel_id, 'x': 1})
+
+def _decode(payload: bytes) -> Tuple[Tuple[int, int], Optional[BatchedMessage]]:
+    """Decode a record into its (channel_id, message_id) key and message (None for a delete)"""
+    data = json.loads(payload)
+    key = (data['ch'], data['id'])
+    if data.get('x'):
+        return key, None
+    return key, BatchedMessage(
+        message_id=data['id'],
+        channel_id=data['ch'],
+        channel_handle=data['h'],
+        text=data['t'],
+        urls=tuple(data['u']),
+        date=datetime.fromisoformat(data['d']) if data['d'] else None
+    )
+
+class BatchWriteAheadLog:
+    """Segmented append-only log of messages accepted into the batch
+
+    append() only encodes the record and queues it, so process_message never
+    waits on disk. A background writer group-commits everything queued since
+    its last pass with a single write + fsync. When a batch is taken, the
+    current segment is sealed; once that batch has been handed off, its
+    segments are released and deleted (in order, even if batches finish out
+    of order). On startup, surviving segments are replayed with mmap reads;
+    a torn or corrupt tail record ends replay of that segment.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 4 * 1024 * 1024, commit_interval: float = 0.02):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.commit_interval = commit_interval
+        os.makedirs(directory, exist_ok=True)
+
+        existing = self._segment_ids()
+        self.oldest_segment = existing[0] if existing else 0
+        self.current_segment = existing[-1] + 1 if existing else 0
+        # Replayed segments belong to the pending batch, so the first seal() covers them
+        self.last_sealed = self.oldest_segment - 1
+        self.released: Set[int] = set()
+
+        self._pending: List[Tuple[int, bytes]] = []
+        self._current_size = 0
+        self._wakeup = asyncio.Event()
+        self._file = None
+        self._file_segment: Optional[int] = None
+        self._write_lock = threading.Lock()
+        # Serializes commits so records reach disk in append order
+        self._commit_lock = asyncio.Lock()
+
+    def _path(self, segment_id: int) -> str:
+        return os.path.join(self.directory, f"{_SEGMENT_PREFIX}{segment_id:010d}{_SEGMENT_SUFFIX}")
+
+    def _segment_ids(self) -> List[int]:
+        ids = []
+        for name in os.listdir(self.directory):
+            if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX):
+                ids.append(int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]))
+        return sorted(ids)
+
+    def replay(self) -> List[BatchedMessage]:
+        """Read back every message still on disk, oldest first, with edits and deletes applied"""
+        messages: Dict[Tuple[int, int], BatchedMessage] = {}
+        for segment_id in self._segment_ids():
+            if segment_id >= self.current_segment:
+                continue
+            path = self._path(segment_id)
+            if os.path.getsize(path) == 0:
+                continue
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                offset = 0
+                while offset + _HEADER.size <= len(data):
+                    length, crc = _HEADER.unpack_from(data, offset)
+                    start = offset + _HEADER.size
+                    payload = data[start:start + length]
+                    if len(payload) < length or zlib.crc32(payload) != crc:
+                        logger.warning(f"⚠️ Truncated or corrupt record in {path} at offset {offset}, stopping replay of this segment")
+                        break
+                    key, message = _decode(payload)
+                    if message is None:
+                        messages.pop(key, None)
+                    else:
+                        messages[key] = message
+                    offset = start + length
+        return list(messages.values())
+
+    def append(self, message: BatchedMessage) -> None:
+        """Queue a message (or its edited state) for the next group commit"""
+        self._queue(_encode(message))
+
+    def append_delete(self, channel_id: int, message_id: int) -> None:
+        """Queue a tombstone for a message dropped from the batch"""
+        self._queue(_encode_delete(channel_id, message_id))
+
+    def _queue(self, record: bytes) -> None:
+        if self._current_size + len(record) > self.segment_bytes and self._current_size:
+            # Roll over to a new segment; it stays part of the same batch until seal()
+            self.current_segment += 1
+            self._current_size = 0
+        self._pending.append((self.current_segment, record))
+        self._current_size += len(record)
+        self._wakeup.set()
+
+    def seal(self) -> Tuple[int, int]:
+        """Close the segments of the batch being taken; returns their id range"""
+        sealed = (self.last_sealed + 1, self.current_segment)
+        self.last_sealed = self.current_segment
+        self.current_segment += 1
+        self._current_size = 0
+        return sealed
+
+    def release(self, sealed: Tuple[int, int]) -> None:
+        """Mark a sealed batch as handed off and delete segments no longer needed"""
+        self.released.update(range(sealed[0], sealed[1] + 1))
+        while self.oldest_segment in self.released:
+            self.released.discard(self.oldest_segment)
+            try:
+                os.remove(self._path(self.oldest_segment))
+            except FileNotFoundError:
+                pass
+            self.oldest_segment += 1
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+        self._file = None
+        self._file_segment = None
+
+    def _write(self, records: List[Tuple[int, bytes]]) -> None:
+        """Append records to their segments and fsync (runs in a worker thread)"""
+        with self._write_lock:
+            for segment_id, record in records:
+                if segment_id < self.oldest_segment:
+                    # Batch already released before this record reached disk
+                    continue
+                if segment_id != self._file_segment:
+                    self._close_file()
+                    self._file = open(self._path(segment_id), 'ab')
+                    self._file_segment = segment_id
+                self._file.write(record)
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+    async def commit(self) -> None:
+        """Write and fsync everything queued so far
+
+        Returns only once every record appended before the call is on disk,
+        including records another commit is still writing.
+        """
+        async with self._commit_lock:
+            # Swap under the lock: an edit queued after a slow write can't overtake the original record
+            records, self._pending = self._pending, []
+            if records:
+                await asyncio.to_thread(self._write, records)
+
+    async def writer_task(self) -> None:
+        """Background group-commit loop"""
+        while True:
+            try:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                # Let concurrent appends pile up so one fsync covers them all
+                await asyncio.sleep(self.commit_interval)
+                await self.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error writing batch WAL: {e}")
+                await asyncio.sleep(1)
+
+    async def close(self) -> None:
+        """Commit anything still queued and close the open segment"""
+        await self.commit()
+        with self._write_lock:
+            self._close_file()
@@ -0,0 +1,32 @@
+"""
+Compact record type for batched channel messages
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+@dataclass(slots=True)
+class BatchedMessage:
+    """A channel message waiting in the batch
+
+    Slotted (no per-instance __dict__) because hour-long batches across many
+    channels hold a lot of these. `sources` lists every channel that posted
+    the story when near-duplicates were merged into this entry.
+    """
+    message_id: int
+    channel_id: int
+    channel_handle: str
+    text: str
+    urls: Tuple[str, ...] = ()
+    date: Optional[datetime] = None
+    sources: Tuple[str, ...] = ()
+
+    def add_source(self, channel_handle: str) -> None:
+        """Record another channel that posted this story"""
+        if channel_handle != self.channel_handle and channel_handle not in self.sources:
+            self.sources = self.sources + (channel_handle,)
+
+    @property
+    def source_handles(self) -> Tuple[str, ...]:
+        """Original channel followed by any merged duplicates"""
+        return (self.channel_handle,) + self.sources
@@ -1,32 +1,198 @@
 """
 Bot forwarding service
 """
+import asyncio
+import heapq
+import itertools
+import time
 import aiohttp
 import json
-from typing import Optional
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
 from src.utils.logger import get_logger
+from src.utils.rate_limit import TokenBucket
 
 logger = get_logger(__name__)
 
+class SendPriority(IntEnum):
+    """Delivery lanes, lower value is served first"""
+    ALERT = 0
+    DIGEST = 1
+    BATCH = 2
+
+class RateLimitScheduler:
+    """Pace Bot API sends under Telegram's global and per-chat limits
+    
+    Senders call acquire() and are released in priority order as soon as both
+    the global bucket and their chat's bucket have a token. A 429 response
+    parks the chat until its retry_after has elapsed.
+    """
+    
+    def __init__(self, global_rate: float = 30, private_chat_rate: float = 1, group_rate_per_minute: float = 20):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.private_chat_rate = private_chat_rate
+        self.group_rate = group_rate_per_minute / 60
+        self.chat_buckets: Dict[str, TokenBucket] = {}
+        self.paused_until: Dict[str, float] = {}
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+    
+    def _chat_bucket(self, target_id: str) -> TokenBucket:
+        bucket = self.chat_buckets.get(target_id)
+        if bucket is None:
+            # Negative ids and @usernames are groups/channels, which have a lower per-minute limit
+            rate = self.group_rate if str(target_id).startswith(('-', '@')) else self.private_chat_rate
+            bucket = TokenBucket(rate, 1)
+            self.chat_buckets[target_id] = bucket
+        return bucket
+    
+    async def acquire(self, target_id: str, priority: int = SendPriority.DIGEST) -> None:
+        """Wait until a message may be sent to target_id"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), target_id, future))
+        self._wakeup.set()
+        await future
+    
+    def defer(self, target_id: str, retry_after: float) -> None:
+        """Park a chat after a 429 until retry_after seconds have passed"""
+        until = time.monotonic() + retry_after
+        self.paused_until[target_id] = max(self.paused_until.get(target_id, 0.0), until)
+        self._wakeup.set()
+    
+    def _dispatch(self) -> Optional[float]:
+        """Release every waiter that can go now; return seconds until the next one can"""
+        now = time.monotonic()
+        next_delay = None
+        remaining = []
+        
+        for waiter in sorted(self._waiters):
+            _, _, target_id, future = waiter
+            if future.done():
+                continue
+            
+            global_wait = self.global_bucket.wait_time(now)
+            chat_wait = max(
+                self._chat_bucket(target_id).wait_time(now),
+                self.paused_until.get(target_id, 0.0) - now
+            )
+            wait = max(global_wait, chat_wait)
+            
+            if wait <= 0:
+                self.global_bucket.consume(now)
+                self._chat_bucket(target_id).consume(now)
+                future.set_result(None)
+            else:
+                remaining.append(waiter)
+                next_delay = wait if next_delay is None else min(next_delay, wait)
+        
+        heapq.heapify(remaining)
+        self._waiters = remaining
+        return next_delay
+    
+    async def _run(self) -> None:
+        """Dispatcher loop, sleeps until the next token or a new waiter"""
+        while True:
+            self._wakeup.clear()
+            delay = self._dispatch()
+            try:
+                if delay is None:
+                    await self._wakeup.wait()
+                else:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def close(self) -> None:
+        """Stop the dispatcher loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
 class BotForwarder:
     """Forward messages to Telegram bot"""
     
-    def __init__(self, bot_token: str, chat_id: str, channel_id: Optional[str] = None):
+    def __init__(self, bot_token: str, chat_id: str, channel_id: Optional[str] = None,
+                 extra_targets: Optional[List[str]] = None, max_concurrent_sends: int = 5,
+                 pool_size: int = 10, dns_cache_ttl: int = 300, keepalive_timeout: int = 60,
+                 global_rate: float = 30, private_chat_rate: float = 1, group_rate_per_minute: float = 20):
         self.bot_token = bot_token
         self.chat_id = chat_id
         self.channel_id = channel_id
         self.bot_url = f"https://api.telegram.org/bot{bot_token}"
-        self.enabled = bool(bot_token and (chat_id or channel_id))
+        
+        # Delivery targets: personal chat, channel, then any extra mirrors (deduplicated, in order)
+        self.targets = list(dict.fromkeys(
+            target for target in [chat_id, channel_id, *(extra_targets or [])] if target
+        ))
+        self.enabled = bool(bot_token and self.targets)
+        self.send_semaphore = asyncio.Semaphore(max(1, max_concurrent_sends))
+        
+        # Shared HTTP connection pool (created lazily, lives until close())
+        self.pool_size = pool_size
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+        # Bot API pacing (global + per-chat token buckets, priority lanes)
+        self.scheduler = RateLimitScheduler(global_rate, private_chat_rate, group_rate_per_minute)
         
         if self.enabled:
             targets = []
-            if chat_id:
-                targets.append(f"personal chat ({chat_id})")
-            if channel_id:
-                targets.append(f"channel ({channel_id})")
+            for target in self.targets:
+                if target == chat_id:
+                    targets.append(f"personal chat ({target})")
+                elif target == channel_id:
+                    targets.append(f"channel ({target})")
+                else:
+                    targets.append(f"target ({target})")
             logger.info(f"Bot forwarder initialized for: {', '.join(targets)}")
         else:
-            logger.warning("Bot forwarder disabled - missing BOT_TOKEN and both BOT_CHAT_ID and BOT_CHANNEL_ID")
+            logger.warning("Bot forwarder disabled - missing BOT_TOKEN or delivery targets (BOT_CHAT_ID, BOT_CHANNEL_ID, BOT_EXTRA_TARGETS)")
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared keep-alive session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._session
+    
+    async def start(self) -> None:
+        """Open the connection pool and pre-warm it with a getMe call"""
+        if not self.enabled:
+            return
+        
+        session = self._get_session()
+        try:
+            async with session.get(f"{self.bot_url}/getMe") as response:
+                await response.read()
+                logger.info(f"Bot HTTP pool warmed up (getMe status: {response.status})")
+        except Exception as e:
+            logger.warning(f"Could not pre-warm bot HTTP pool: {e}")
+    
+    async def close(self) -> None:
+        """Stop the send scheduler and close the connection pool"""
+        await self.scheduler.close()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Bot HTTP pool closed")
+        self._session = None
     
     def _sanitize_text(self, text: str) -> str:
         """Sanitize text to prevent Markdown parsing errors"""
@@ -48,7 +214,33 @@ class BotForwarder:
         
         return text
     
-    async def _send_to_chat(self, target_id: str, channel_handle: str, message_text: str) -> bool:
+    async def _post_message(self, payload: Dict[str, str], priority: int) -> Tuple[int, str]:
+        """POST sendMessage through the scheduler, retrying 429s after retry_after"""
+        target_id = payload["chat_id"]
+        session = self._get_session()
+        
+        while True:
+            await self.scheduler.acquire(target_id, priority)
+            async with session.post(
+                f"{self.bot_url}/sendMessage",
+                json=payload
+            ) as response:
+                status = response.status
+                body = await response.text()
+            
+            if status != 429:
+                return status, body
+            
+            # Rate limited: park this chat for retry_after and try again
+            try:
+                retry_after = json.loads(body).get("parameters", {}).get("retry_after", 1)
+            except (ValueError, AttributeError):
+                retry_after = 1
+            logger.warning(f"⏳ Rate limited by Telegram for {target_id}, retrying in {retry_after}s")
+            self.scheduler.defer(target_id, retry_after)
+    
+    async def _send_to_chat(self, target_id: str, channel_handle: str, message_text: str,
+                            priority: int = SendPriority.DIGEST) -> bool:
         """Send message to a specific chat/channel"""
         try:
             # Sanitize the message text
@@ -64,94 +256,67 @@ class BotForwarder:
                 "parse_mode": "HTML"
             }
             
-            # Send via Telegram Bot API
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.bot_url}/sendMessage",
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    if response.status == 200:
-                        logger.info(f"✅ Message forwarded to {target_id} from {channel_handle}")
-                        return True
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ Failed to forward message to {target_id}: {response.status} - {error_text}")
-                        
-                        # Fallback: try without parse_mode if Markdown fails
-                        if response.status == 400 and "parse entities" in error_text:
-                            logger.info(f"🔄 Retrying without Markdown formatting for {target_id}")
-                            # Remove parse_mode key for fallback
-                            payload.pop("parse_mode", None)
-                            payload["text"] = f"📢 @{channel_handle}\n\n{sanitized_message}"
-                            
-                            async with session.post(
-                                f"{self.bot_url}/sendMessage",
-                                json=payload,
-                                timeout=aiohttp.ClientTimeout(total=10)
-                            ) as retry_response:
-                                if retry_response.status == 200:
-                                    logger.info(f"✅ Message forwarded (fallback) to {target_id} from {channel_handle}")
-                                    return True
-                                else:
-                                    retry_error = await retry_response.text()
-                                    logger.error(f"❌ Fallback also failed for {target_id}: {retry_error}")
-                        
-                        return False
+            # Send via Telegram Bot API over the shared connection pool
+            status, error_text = await self._post_message(payload, priority)
+            if status == 200:
+                logger.info(f"✅ Message forwarded to {target_id} from {channel_handle}")
+                return True
+            
+            logger.error(f"❌ Failed to forward message to {target_id}: {status} - {error_text}")
+            
+            # Fallback: try without parse_mode if Markdown fails
+            if status == 400 and "parse entities" in error_text:
+                logger.info(f"🔄 Retrying without Markdown formatting for {target_id}")
+                # Remove parse_mode key for fallback
+                payload.pop("parse_mode", None)
+                payload["text"] = f"📢 @{channel_handle}\n\n{sanitized_message}"
+                
+                retry_status, retry_error = await self._post_message(payload, priority)
+                if retry_status == 200:
+                    logger.info(f"✅ Message forwarded (fallback) to {target_id} from {channel_handle}")
+                    return True
+                logger.error(f"❌ Fallback also failed for {target_id}: {retry_error}")
+            
+            return False
                         
         except Exception as e:
             logger.error(f"❌ Error forwarding message to {target_id}: {e}")
             return False
     
-    def _extract_urls_from_entities(self, message) -> list:
-        """Extract URLs from Telegram message entities"""
-        urls = []
-        
-        if not hasattr(message, 'entities') or not message.entities:
-            return urls
-        
-        for entity in message.entities:
-            if hasattr(entity, 'url') and entity.url:
-                urls.append(entity.url)
-            elif hasattr(entity, 'text') and entity.text:
-                urls.append(entity.text)
-        
-        return list(set(urls))  # Remove duplicates
-    
-    def _extract_urls_from_text(self, text: str) -> list:
-        """Extract URLs from text using regex (fallback)"""
-        import re
-        url_pattern = r'https?://[^\s]+'
-        return list(set(re.findall(url_pattern, text)))
+    async def _send_bounded(self, target_id: str, channel_handle: str, message_text: str, priority: int) -> bool:
+        """Send to one target while holding a fan-out slot"""
+        async with self.send_semaphore:
+            return await self._send_to_chat(target_id, channel_handle, message_text, priority)
     
-    async def forward_message(self, channel_handle: str, message_text: str, message=None) -> bool:
-        """Forward a message to bot (personal chat and/or channel)"""
+    async def send_to_target(self, target_id: str, channel_handle: str, message_text: str,
+                             priority: int = SendPriority.DIGEST) -> bool:
+        """Send one message to a single target through the pool and rate limiter"""
         if not self.enabled:
             return False
+        return await self._send_bounded(target_id, channel_handle, message_text, priority)
+    
+    async def forward_message(self, channel_handle: str, message_text: str, message=None,
+                              priority: int = SendPriority.DIGEST) -> Dict[str, bool]:
+        """Forward a message to all configured targets concurrently
         
-        # Extract URLs from message entities if available, otherwise from text
-        urls = []
-        if message:
-            urls = self._extract_urls_from_entities(message)
-        
-        if not urls:
-            urls = self._extract_urls_from_text(message_text)
-        
-        # Add URLs to message if found
-        # if urls:
-        #     message_text += f"\n\n🔗 **Links:**\n" + "\n".join([f"• {url}" for url in urls])
-        
-        success = True
+        Returns:
+            Mapping of target id to whether delivery to that target succeeded
+        """
+        if not self.enabled:
+            return {}
         
-        # Send to personal chat if configured
-        if self.chat_id:
-            success &= await self._send_to_chat(self.chat_id, channel_handle, message_text)
+        # Fan out to every target with bounded parallelism
+        outcomes = await asyncio.gather(*[
+            self._send_bounded(target_id, channel_handle, message_text, priority)
+            for target_id in self.targets
+        ])
+        results = dict(zip(self.targets, outcomes))
         
-        # Send to channel if configured
-        if self.channel_id:
-            success &= await self._send_to_chat(self.channel_id, channel_handle, message_text)
+        failed = [target_id for target_id, ok in results.items() if not ok]
+        if failed:
+            logger.warning(f"⚠️ Delivery from {channel_handle} failed for {len(failed)}/{len(results)} targets: {', '.join(failed)}")
         
-        return success
+        return results
     
     async def send_test_message(self) -> bool:
         """Send a test message to verify bot configuration"""
@@ -160,4 +325,5 @@ class BotForwarder:
             return False
         
         test_message = "🤖 Bot forwarder is working! Messages from monitored channels will be forwarded here."
-        return await self.forward_message("TEST", test_message) 
\ No newline at end of file
+        results = await self.forward_message("TEST", test_message)
+        return bool(results) and all(results.values()) 
\ No newline at end of file
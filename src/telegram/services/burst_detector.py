@@ -0,0 +1,175 @@
+"""
+Streaming burst detection over recent message terms
+"""
+import re
+import time
+from array import array
+from typing import List, Optional, Tuple
+from src.telegram.services.dedupe import STOP_WORDS
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_TERM_RE = re.compile(r'\w{3,}')
+
+def _popcount(value: int) -> int:
+    return bin(value).count('1')
+
+class BurstDetector:
+    """Spot terms that several channels start posting at once
+
+    Term counts for the last `window` seconds live in a sliding Count-Min
+    sketch made of `buckets` sub-window sketches; alongside each counter is
+    a 64-bit bitmap of the channels that posted the term, so distinct
+    channels can be estimated without storing them. Counts that slide out of
+    the window are folded into an exponentially decayed baseline sketch.
+    A term bursts when, within the window, it was posted by at least
+    `min_channels` channels, at least `min_count` times and `ratio` times
+    more often than its baseline predicts; a message only signals a burst
+    when at least `min_terms` of its terms burst together, since a real
+    story lifts several words at once while chance spikes of single rare
+    words are common at high message rates. The few terms that cross
+    `min_count` are tracked as heavy hitters (bounded to `top_k`) for the
+    cooldown and for reporting. Nothing fires during the first two windows,
+    while the baseline warms up. Memory is fixed by depth x width, whatever the
+    number of distinct terms.
+    """
+
+    def __init__(self, window: float = 600, buckets: int = 5, width: int = 16384, depth: int = 4,
+                 min_channels: int = 3, min_count: int = 5, ratio: float = 5, min_terms: int = 2,
+                 baseline_half_life: float = 6 * 3600, top_k: int = 128):
+        # Up to four 16-bit indices come out of one 64-bit term hash
+        self.width = 1 << min(16, max(1, (width - 1).bit_length()))
+        self.depth = max(1, min(depth, 4))
+        self.buckets = max(1, buckets)
+        self.bucket_seconds = window / self.buckets
+        self.window = window
+        self.min_channels = min_channels
+        self.min_count = min_count
+        self.ratio = ratio
+        self.min_terms = max(1, min_terms)
+        self.top_k = top_k
+
+        cells = self.depth * self.width
+        self.window_counts = array('l', [0]) * cells
+        self.bucket_counts = [array('l', [0]) * cells for _ in range(self.buckets)]
+        self.bucket_channels = [array('Q', [0]) * cells for _ in range(self.buckets)]
+        self.baseline = array('d', [0.0]) * cells
+        # Per bucket rotation; baseline / horizon is the long-run count per second
+        self.decay = 0.5 ** (self.bucket_seconds / baseline_half_life)
+        self.baseline_horizon = self.bucket_seconds / (1 - self.decay)
+        self.current = 0
+        self.started_at = self.bucket_started = time.monotonic()
+
+        # Heavy hitters: term -> (window estimate, monotonic time it last fired)
+        self.heavy_hitters: dict = {}
+
+        # Statistics
+        self.messages = 0
+        self.update_seconds = 0.0
+
+    def _indices(self, term: str) -> List[int]:
+        h = hash(term) & 0xFFFFFFFFFFFFFFFF
+        mask = self.width - 1
+        return [row * self.width + ((h >> (16 * row)) & mask) for row in range(self.depth)]
+
+    def _rotate(self, now: float) -> None:
+        """Advance the ring to the current bucket, expiring old sub-windows"""
+        steps = int((now - self.bucket_started) // self.bucket_seconds)
+        if steps <= 0:
+            return
+        window_counts, baseline, decay = self.window_counts, self.baseline, self.decay
+        for _ in range(min(steps, self.buckets)):
+            self.current = (self.current + 1) % self.buckets
+            expired = self.bucket_counts[self.current]
+            for cell, count in enumerate(expired):
+                if count:
+                    window_counts[cell] -= count
+                baseline[cell] = baseline[cell] * decay + count
+            self.bucket_counts[self.current] = array('l', [0]) * len(expired)
+            self.bucket_channels[self.current] = array('Q', [0]) * len(expired)
+        if steps > self.buckets:
+            # Idle for longer than the window: the rest of the gap only decays the baseline
+            factor = decay ** (steps - self.buckets)
+            self.baseline = array('d', (value * factor for value in baseline))
+        self.bucket_started += steps * self.bucket_seconds
+
+    def _channel_estimate(self, cells: List[int]) -> int:
+        """Distinct channels that posted a term in the window (upper bound)"""
+        combined = -1
+        for cell in cells:
+            bitmap = 0
+            for channels in self.bucket_channels:
+                bitmap |= channels[cell]
+            combined &= bitmap
+        return _popcount(combined & 0xFFFFFFFFFFFFFFFF)
+
+    def record(self, channel_id: int, text: Optional[str]) -> Optional[Tuple[str, int, int]]:
+        """Count a message's terms; returns (term, count, channels) if one of them just burst"""
+        if not text:
+            return None
+        started = time.perf_counter()
+        now = time.monotonic()
+        self._rotate(now)
+
+        counts = self.bucket_counts[self.current]
+        channels = self.bucket_channels[self.current]
+        window_counts = self.window_counts
+        channel_bit = 1 << ((channel_id * 0x9E3779B97F4A7C15 >> 58) & 63)
+        # Baseline rates are averaged over the time actually observed, up to the decay horizon;
+        # the first two windows only warm the baseline up
+        observed = now - self.started_at - self.window
+        if observed < self.window:
+            observed = 0
+        horizon = min(self.baseline_horizon, observed)
+        bursting = []
+
+        for term in set(_TERM_RE.findall(text.lower())) - STOP_WORDS:
+            if term.isdigit():
+                continue
+            cells = self._indices(term)
+            estimate = None
+            for cell in cells:
+                counts[cell] += 1
+                channels[cell] |= channel_bit
+                window_counts[cell] += 1
+                estimate = window_counts[cell] if estimate is None else min(estimate, window_counts[cell])
+
+            if estimate < self.min_count or horizon <= 0:
+                continue
+            expected = min(self.baseline[cell] for cell in cells) / horizon * self.window
+            if estimate < self.ratio * max(expected, 1):
+                continue
+            channel_count = self._channel_estimate(cells)
+            if channel_count < self.min_channels:
+                continue
+
+            _, fired_at = self.heavy_hitters.get(term, (0, None))
+            self.heavy_hitters[term] = (estimate, fired_at)
+            bursting.append((term, estimate, channel_count, fired_at))
+
+        burst = None
+        if len(bursting) >= self.min_terms:
+            fresh = [item for item in bursting if item[3] is None or now - item[3] >= self.window]
+            if fresh:
+                # Cool down every term of the story so it fires once per window
+                for term, estimate, _, _ in bursting:
+                    self.heavy_hitters[term] = (estimate, now)
+                term, estimate, channel_count, _ = max(fresh, key=lambda item: item[1])
+                burst = (term, estimate, channel_count)
+
+        if len(self.heavy_hitters) > self.top_k:
+            # Keep the strongest terms; a dropped term can fire again later
+            strongest = sorted(self.heavy_hitters.items(), key=lambda item: item[1][0], reverse=True)
+            self.heavy_hitters = dict(strongest[:self.top_k])
+
+        self.messages += 1
+        self.update_seconds += time.perf_counter() - started
+        return burst
+
+    def report(self) -> str:
+        """Update cost and the current top terms"""
+        average_us = self.update_seconds / self.messages * 1e6 if self.messages else 0.0
+        top = sorted(self.heavy_hitters.items(), key=lambda item: item[1][0], reverse=True)[:5]
+        terms = ', '.join(f"{term} ({estimate})" for term, (estimate, _) in top) or 'none'
+        return f"{self.messages} messages, {average_us:.0f}us per update, top terms: {terms}"
@@ -2,16 +2,31 @@
 Main channel monitoring service
 """
 import asyncio
-from typing import Dict, Any, Optional
+import html
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from telethon import errors
 from telethon.tl.functions.updates import GetStateRequest
+from telethon.tl.types import Message
 from src.telegram.client.telegram_client import TelegramClientWrapper
 from src.telegram.handlers.message_handler import MessageHandler
 from src.telegram.handlers.event_handler import EventHandler
 from src.telegram.handlers.gap_handler import GapHandler
-from src.telegram.services.bot_forwarder import BotForwarder
-from src.telegram.services.llm_processor import process_batch_with_llm
+from src.telegram.services.bot_forwarder import BotForwarder, SendPriority
+from src.telegram.services.burst_detector import BurstDetector
+from src.telegram.services.batch_flush import BatchFlushController
+from src.telegram.services.batch_renderer import BatchRenderer, split_html
+from src.telegram.services.batched_message import BatchedMessage
+from src.telegram.services.batch_wal import BatchWriteAheadLog
+from src.telegram.services.dedupe import NearDuplicateDetector, simhash
+from src.telegram.services.history_backfill import HistoryBackfill
+from src.telegram.services.delivery_queue import DeliveryQueue
+from src.telegram.services.llm_pipeline import LLMPipeline
+from src.telegram.services.seen_messages import SeenMessageSet
+from src.telegram.services.watchlist import Watchlist
 from src.core.config import Config
 from src.utils.logger import get_logger
+from src.utils.url_extractor import extract_urls
 
 logger = get_logger(__name__)
 
@@ -23,159 +38,404 @@ class ChannelMonitor:
         self.message_handler = MessageHandler()
         self.event_handler = None
         self.gap_handler = None
-        self.bot_forwarder = BotForwarder(Config.BOT_TOKEN, Config.BOT_CHAT_ID, Config.BOT_CHANNEL_ID)
+        self.bot_forwarder = BotForwarder(
+            Config.BOT_TOKEN,
+            Config.BOT_CHAT_ID,
+            Config.BOT_CHANNEL_ID,
+            extra_targets=Config.BOT_EXTRA_TARGETS,
+            max_concurrent_sends=Config.BOT_MAX_CONCURRENT_SENDS,
+            pool_size=Config.BOT_HTTP_POOL_SIZE,
+            dns_cache_ttl=Config.BOT_HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=Config.BOT_HTTP_KEEPALIVE_TIMEOUT,
+            global_rate=Config.BOT_GLOBAL_RATE,
+            private_chat_rate=Config.BOT_PRIVATE_CHAT_RATE,
+            group_rate_per_minute=Config.BOT_GROUP_RATE_PER_MINUTE
+        )
+        self.delivery_queue = DeliveryQueue(
+            Config.DELIVERY_QUEUE_PATH,
+            self.bot_forwarder,
+            max_attempts=Config.DELIVERY_MAX_ATTEMPTS,
+            retry_base=Config.DELIVERY_RETRY_BASE,
+            retry_max=Config.DELIVERY_RETRY_MAX,
+            retention_hours=Config.DELIVERY_RETENTION_HOURS
+        )
+        self.llm_pipeline = LLMPipeline(
+            self.handle_llm_result,
+            workers=Config.LLM_WORKERS,
+            max_queue=Config.LLM_QUEUE_SIZE
+        )
         self.background_tasks = []
+        # Startup phase -> seconds, reported once monitoring starts
+        self.startup_times: Dict[str, float] = {}
         
         # Message batching
-        self.message_batch = []
+        self.seen_messages = SeenMessageSet(window=Config.SEEN_MESSAGE_WINDOW)
+        self.batch_wal = BatchWriteAheadLog(
+            Config.BATCH_WAL_DIR,
+            segment_bytes=Config.BATCH_WAL_SEGMENT_BYTES,
+            commit_interval=Config.BATCH_WAL_COMMIT_INTERVAL
+        )
+        # Pending entries keyed by (channel_id, message_id), in arrival order
+        self.message_batch: Dict[Tuple[int, int], BatchedMessage] = {}
         self.batch_lock = asyncio.Lock()
         self.last_batch_time = asyncio.get_event_loop().time()
-        self.batch_interval = Config.BATCH_INTERVAL
+        self.flush_controller = BatchFlushController(
+            max_messages=Config.BATCH_MAX_MESSAGES,
+            max_bytes=Config.BATCH_MAX_BYTES,
+            max_tokens=Config.BATCH_MAX_TOKENS,
+            max_age=Config.BATCH_INTERVAL
+        )
+        self.deduplicator = NearDuplicateDetector(
+            window_seconds=Config.DEDUPE_WINDOW_HOURS * 3600,
+            max_distance=Config.DEDUPE_MAX_DISTANCE,
+            capacity=Config.DEDUPE_CAPACITY
+        ) if Config.DEDUPE_ENABLED else None
+        self.watchlist = Watchlist(Config.WATCHLIST_PATH)
+        self.burst_detector = BurstDetector(
+            window=Config.BURST_WINDOW,
+            min_channels=Config.BURST_MIN_CHANNELS,
+            min_count=Config.BURST_MIN_COUNT,
+            ratio=Config.BURST_RATIO
+        ) if Config.BURST_DETECTION_ENABLED else None
     
     async def initialize(self) -> None:
         """Initialize the channel monitor"""
         try:
+            started = time.perf_counter()
             await self.telegram_client.connect()
+            self.startup_times['connect'] = time.perf_counter() - started
             self.event_handler = EventHandler(self.telegram_client.get_client())
             self.gap_handler = GapHandler(
                 self.telegram_client.get_client(),
-                self.telegram_client.get_target_channels()
+                self.telegram_client.get_target_channels(),
+                checkpoints=self.telegram_client.get_pts_checkpoints(),
+                concurrency=Config.GAP_FILL_CONCURRENCY,
+                rpc_rate=Config.GAP_FILL_RPC_RATE,
+                min_interval=Config.POLLING_INTERVAL,
+                max_interval=Config.GAP_POLL_MAX_INTERVAL,
+                max_backfill=Config.CATCHUP_MAX_BACKFILL_HOURS * 3600,
+                on_invalid_channel=self.telegram_client.reresolve_channel
             )
             # Set up message processor for gap handler
             self.gap_handler.set_message_processor(self.process_message)
+            self.restore_pending_batch()
+            
+            # Install event handlers up front; channels start flowing as they are registered
+            self.event_handler.register_message_handler(self.process_message)
+            self.event_handler.register_edit_handler(self.process_edit)
+            self.event_handler.register_delete_handler(self.process_delete)
+            self.event_handler.register_live_update_handler(self.gap_handler.note_live_update)
+            self.event_handler.enable_ingest_queue(
+                consumers=Config.INGEST_CONSUMERS,
+                max_size=Config.INGEST_QUEUE_SIZE,
+                overflow_policy=Config.INGEST_OVERFLOW_POLICY,
+                report_interval=Config.INGEST_REPORT_INTERVAL
+            )
+            # Consume right away: channels start delivering updates while the rest are still being registered
+            self.background_tasks.extend(self.event_handler.ingest_queue.start())
+            if Config.RAW_UPDATE_DISPATCH:
+                self.event_handler.install_raw_handlers(self.telegram_client.get_target_channels())
+            else:
+                self.event_handler.install_handlers(self.telegram_client.get_target_channels())
             logger.info("Channel monitor initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize channel monitor: {e}")
             raise
 
     async def add_channels(self, channels: list) -> None:
-        """Add channels to monitor"""
-        for channel in channels:
-            try:
-                await self.telegram_client.add_target_channel(channel)
-                logger.info(f"Added channel: {channel}")
-            except Exception as e:
-                logger.error(f"Failed to add channel {channel}: {e}")
-
-    def _extract_urls_from_message(self, message) -> list:
-        """Extract URLs from Telegram message entities"""
-        urls = []
+        """Add channels to monitor, resolving them concurrently
+        
+        Each channel starts ingesting as soon as it is registered. Concurrency
+        is capped, and a FloodWait from any resolve pauses all workers for the
+        requested time before the channel is retried (the client raises every
+        FloodWait instead of sleeping inside the call). Channels resume from
+        their pts checkpoint, so gap filling picks up exactly where the last
+        run stopped. The registration log breaks the time down into cache
+        hits, resolve RPCs and pts initialization.
+        """
+        started = time.perf_counter()
         
-        if not hasattr(message, 'entities') or not message.entities:
-            return urls
+        semaphore = asyncio.Semaphore(max(1, Config.CHANNEL_REGISTRATION_CONCURRENCY))
+        resume_at = 0.0
+        durations = []
         
-        for entity in message.entities:
-            if hasattr(entity, 'url') and entity.url:
-                urls.append(entity.url)
-            elif hasattr(entity, 'text') and entity.text:
-                urls.append(entity.text)
+        async def register(channel: str) -> bool:
+            nonlocal resume_at
+            for attempt in range(1, Config.CHANNEL_REGISTRATION_MAX_RETRIES + 1):
+                async with semaphore:
+                    delay = resume_at - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    channel_started = time.perf_counter()
+                    try:
+                        await self.telegram_client.add_target_channel(channel)
+                        durations.append(time.perf_counter() - channel_started)
+                        logger.info(f"Added channel: {channel}")
+                        return True
+                    except errors.FloodWaitError as e:
+                        resume_at = max(resume_at, time.monotonic() + e.seconds)
+                        logger.warning(f"Flood wait while adding {channel}: pausing registration for {e.seconds}s (attempt {attempt})")
+                    except Exception as e:
+                        logger.error(f"Failed to add channel {channel}: {e}")
+                        return False
+            logger.error(f"Failed to add channel {channel}: still flood-limited after {Config.CHANNEL_REGISTRATION_MAX_RETRIES} attempts")
+            return False
         
-        return list(set(urls))  # Remove duplicates
+        results = await asyncio.gather(*[register(channel) for channel in channels])
+        self.telegram_client.save_entity_cache()
+        self.telegram_client.get_pts_checkpoints().flush()
+        
+        slowest = max(durations) if durations else 0.0
+        average = sum(durations) / len(durations) if durations else 0.0
+        self.startup_times['registration'] = time.perf_counter() - started
+        logger.info(
+            f"⏱️ Channel registration: {sum(results)}/{len(channels)} added in {self.startup_times['registration']:.2f}s "
+            f"(per channel avg: {average:.2f}s, max: {slowest:.2f}s; {self.telegram_client.phase_report()})"
+        )
+
+    def restore_pending_batch(self) -> None:
+        """Rebuild the pending batch from the write-ahead log after a restart"""
+        started = time.perf_counter()
+        restored = 0
+        for entry in self.batch_wal.replay():
+            if not self.seen_messages.check_and_add(entry.channel_id, entry.message_id):
+                continue
+            self.message_batch[(entry.channel_id, entry.message_id)] = entry
+            self.flush_controller.record(entry.text, entry.urls)
+            if self.deduplicator:
+                self.deduplicator.add(simhash(entry.text or ''), entry, key=(entry.channel_id, entry.message_id))
+            restored += 1
+        
+        elapsed = time.perf_counter() - started
+        self.startup_times['WAL replay'] = elapsed
+        if restored:
+            logger.info(f"♻️ Restored {restored} pending messages from the batch WAL in {elapsed * 1000:.1f}ms")
 
     async def process_message(self, message, channel_title: str, is_edit: bool = False) -> None:
         """Process incoming message: add to batch for later forwarding"""
         try:
+            if not isinstance(message, Message):
+                # Service messages from differences or history: no text to forward
+                return
+            channel_id = message.peer_id.channel_id
+            
+            # Live events and gap filling can both deliver the same message
+            if not is_edit and not self.seen_messages.check_and_add(channel_id, message.id):
+                logger.debug(f"Skipping already ingested message {message.id} from channel {channel_id}")
+                return
+            
             message_text = getattr(message, 'message', str(message))
             print(f"[Channel: {channel_title}] {message_text}")
             
             # Get channel handle from target channels
-            channel_id = message.peer_id.channel_id
             target_channels = self.telegram_client.get_target_channels()
             channel_data = target_channels.get(channel_id, {})
             channel_handle = channel_data.get('handle', channel_title)
             
             # Extract URLs from message
-            urls = self._extract_urls_from_message(message)
+            urls = extract_urls(message)
+            
+            # Several channels picking up the same story: flush the digest early
+            if self.burst_detector:
+                burst = self.burst_detector.record(channel_id, message_text)
+                if burst:
+                    term, count, channels = burst
+                    logger.info(f"📈 Burst detected: '{term}' in {count} messages from ~{channels} channels")
+                    self.flush_controller.trigger(f"burst in '{term}' ({count} messages, ~{channels} channels)")
             
             # Add message to batch with URLs
             async with self.batch_lock:
-                self.message_batch.append({
-                    'channel_handle': channel_handle,
-                    'message_text': message_text,
-                    'urls': urls,
-                    'timestamp': asyncio.get_event_loop().time()
-                })
+                fingerprint = None
+                if self.deduplicator:
+                    fingerprint, slot = self.deduplicator.find(message_text)
+                    if slot is not None:
+                        # Near-duplicate: merge into the pending entry, or drop if already sent
+                        self.deduplicator.record_duplicate(self.flush_controller.estimate_tokens(message_text))
+                        entry = self.deduplicator.payloads[slot]
+                        if entry is not None:
+                            entry.add_source(channel_handle)
+                            logger.info(f"🔁 Merged near-duplicate from {channel_handle} into story from {entry.channel_handle}")
+                        else:
+                            logger.info(f"🔁 Dropped near-duplicate from {channel_handle} (already sent in the last {Config.DEDUPE_WINDOW_HOURS}h): {message_text[:100]!r}")
+                        return
+                
+                # Watchlist hits skip batching and go out as alerts right away;
+                # checked after dedupe so a story reposted by many channels alerts once
+                watchlist_hits = self.watchlist.scan(message_text)
+                if watchlist_hits:
+                    if self.deduplicator:
+                        # Sent: later copies are dropped
+                        self.deduplicator.add(fingerprint)
+                    self.send_alert(channel_id, message.id, channel_handle, message_text, urls, watchlist_hits)
+                    return
+                
+                entry = BatchedMessage(
+                    message_id=message.id,
+                    channel_id=channel_id,
+                    channel_handle=channel_handle,
+                    text=message_text,
+                    urls=tuple(urls),
+                    date=getattr(message, 'date', None)
+                )
+                self.message_batch[(channel_id, message.id)] = entry
+                self.batch_wal.append(entry)
+                self.flush_controller.record(message_text, urls)
+                if self.deduplicator:
+                    self.deduplicator.add(fingerprint, entry, key=(channel_id, message.id))
             
             logger.info(f"📦 Added message to batch from {channel_handle} (batch size: {len(self.message_batch)}, URLs: {len(urls)})")
             
         except Exception as e:
             logger.error(f"❌ Error processing message in channel monitor: {e}")
     
+    def send_alert(self, channel_id: int, message_id: int, channel_handle: str,
+                   message_text: str, urls: List[str], hits: List[str]) -> None:
+        """Queue a watchlist match for immediate delivery on the alert lane"""
+        text = (
+            f"🚨 <b>Watchlist: {html.escape(', '.join(hits))}</b>\n\n"
+            f"@{html.escape(channel_handle)}: {html.escape(message_text or '')}"
+        )
+        if urls:
+            text += "\n\n" + "\n".join(f"• {html.escape(url)}" for url in urls)
+        self.delivery_queue.enqueue(
+            channel_handle,
+            split_html(text),
+            priority=SendPriority.ALERT,
+            idempotency_key=f"alert:{channel_id}:{message_id}"
+        )
+        logger.info(f"🚨 Watchlist alert from {channel_handle}: {', '.join(hits)}")
+    
+    async def process_edit(self, message, channel_title: str, is_edit: bool = True) -> None:
+        """Apply an edit to the pending batch entry, if the message has not been sent yet
+        
+        An edit that now matches the watchlist takes the entry out of the batch
+        and sends it as an alert instead.
+        """
+        try:
+            channel_id = message.peer_id.channel_id
+            message_text = getattr(message, 'message', None) or ''
+            async with self.batch_lock:
+                entry = self.message_batch.get((channel_id, message.id))
+                if entry is None:
+                    # Already sent, or never batched
+                    return
+                if message_text == entry.text:
+                    # Reactions, buttons, etc.: nothing the digest would show
+                    return
+                
+                watchlist_hits = self.watchlist.scan(message_text)
+                if watchlist_hits:
+                    # The edit made the story alert-worthy: send it now instead of in the digest
+                    del self.message_batch[(channel_id, message.id)]
+                    self.batch_wal.append_delete(channel_id, message.id)
+                    if self.deduplicator:
+                        self.deduplicator.discard((channel_id, message.id))
+                        self.deduplicator.add(simhash(message_text))
+                    self.send_alert(channel_id, message.id, entry.channel_handle, message_text,
+                                    extract_urls(message), watchlist_hits)
+                    return
+                
+                # Replacing in place coalesces bursts of edits into the latest text
+                entry.text = message_text
+                entry.urls = tuple(extract_urls(message))
+                self.batch_wal.append(entry)
+                if self.deduplicator:
+                    # Later copies should match the story as it reads now
+                    self.deduplicator.discard((channel_id, message.id))
+                    self.deduplicator.add(simhash(message_text), entry, key=(channel_id, message.id))
+            
+            logger.info(f"✏️ Updated pending message {message.id} from {entry.channel_handle} with edited text")
+        except Exception as e:
+            logger.error(f"❌ Error applying edit in channel monitor: {e}")
+    
+    async def process_delete(self, deleted_ids: List[int], channel_id: int) -> None:
+        """Drop deleted messages from the pending batch"""
+        try:
+            removed = 0
+            async with self.batch_lock:
+                for message_id in deleted_ids:
+                    entry = self.message_batch.get((channel_id, message_id))
+                    if entry is None or entry.sources:
+                        # Already sent, or the story was also posted by other channels
+                        continue
+                    del self.message_batch[(channel_id, message_id)]
+                    self.batch_wal.append_delete(channel_id, message_id)
+                    if self.deduplicator:
+                        # Otherwise a later copy would merge into the dropped entry and be lost
+                        self.deduplicator.discard((channel_id, message_id))
+                    removed += 1
+            
+            if removed:
+                logger.info(f"🗑️ Removed {removed} deleted messages from the pending batch (batch size: {len(self.message_batch)})")
+        except Exception as e:
+            logger.error(f"❌ Error applying delete in channel monitor: {e}")
+    
     async def send_batch(self) -> None:
         """Send all collected messages as a batch"""
         async with self.batch_lock:
+            self.flush_controller.reset()
             if not self.message_batch:
                 return
             
-            batch_messages = self.message_batch.copy()
+            batch_messages = list(self.message_batch.values())
             self.message_batch.clear()
+            sealed_segments = self.batch_wal.seal()
+            if self.deduplicator:
+                self.deduplicator.release_payloads()
             self.last_batch_time = asyncio.get_event_loop().time()
         
         if not batch_messages:
             return
         
         logger.info(f"📤 Sending batch of {len(batch_messages)} messages")
+        if self.deduplicator:
+            logger.info(f"🧹 Dedupe: {self.deduplicator.report()}")
+        if self.burst_detector:
+            logger.info(f"📈 Burst detector: {self.burst_detector.report()}")
         
-        # Combine all messages into one batch
-        combined_text = f"**Batched {len(batch_messages)} messages:**\n\n"
+        # Render forwarded chunks and LLM input in one pass; chunks are persisted and delivered by the drain task
+        renderer = BatchRenderer(batch_messages)
+        self.delivery_queue.enqueue("BATCH", renderer.iter_forward_chunks(), priority=SendPriority.BATCH)
         
-        # Collect all URLs
-        all_urls = []
-        
-        for i, msg in enumerate(batch_messages, 1):
-            channel_handle = msg['channel_handle']
-            message_text = msg['message_text']
-            urls = msg.get('urls', [])
-            
-            combined_text += f"{i}. @{channel_handle}: {message_text}\n\n"
-            all_urls.extend(urls)
+        # Hand the batch to the LLM stage; summarization overlaps with further ingestion
+        # The WAL segments are dropped once the batch is summarized; until then a restart replays it
+        await self.llm_pipeline.submit(
+            batch_messages,
+            renderer.llm_text,
+            on_done=lambda: self.batch_wal.release(sealed_segments)
+        )
         
-        # Add URLs section if any URLs were found
-        if all_urls:
-            unique_urls = list(set(all_urls))  # Remove duplicates
-            combined_text += f"🔗 **Links ({len(unique_urls)}):**\n"
-            for url in unique_urls:
-                combined_text += f"• {url}\n"
-        
-        # Send the original batch
-        await self.bot_forwarder.forward_message("BATCH", combined_text)
-        
-        # Process with LLM and send result
-        try:
-            llm_result = await process_batch_with_llm(batch_messages)
-            
-            # Handle different result types
-            if hasattr(llm_result, 'result'):
-                # ProcessingResult object
-                result_text = llm_result.result
-            elif isinstance(llm_result, str):
-                # String result
-                result_text = llm_result
-            else:
-                # Other object types
-                result_text = str(llm_result)
-            
-            if result_text and not result_text.startswith("LLM processing failed"):
-                # llm_text = f"🤖 **LLM Analysis:**\n\n{result_text}"
-                await self.bot_forwarder.forward_message("LLM", result_text)
-                logger.info(f"✅ LLM analysis sent for {len(batch_messages)} messages")
-            else:
-                logger.warning(f"⚠️ LLM processing failed or returned empty result")
-        except Exception as e:
-            logger.error(f"❌ Error in LLM processing: {e}")
+        logger.info(f"✅ Batch queued successfully ({len(batch_messages)} messages, {renderer.url_count} URLs)")
+    
+    async def handle_llm_result(self, batch_messages: List[BatchedMessage], llm_result) -> None:
+        """Queue the LLM analysis of a batch for delivery"""
+        # Handle different result types
+        if hasattr(llm_result, 'result'):
+            # ProcessingResult object
+            result_text = llm_result.result
+        elif isinstance(llm_result, str):
+            # String result
+            result_text = llm_result
+        else:
+            # Other object types
+            result_text = str(llm_result)
         
-        logger.info(f"✅ Batch sent successfully ({len(batch_messages)} messages, {len(all_urls)} URLs)")
+        if result_text and not result_text.startswith("LLM processing failed"):
+            # llm_text = f"🤖 **LLM Analysis:**\n\n{result_text}"
+            self.delivery_queue.enqueue("LLM", split_html(result_text), priority=SendPriority.DIGEST)
+            logger.info(f"✅ LLM analysis queued for {len(batch_messages)} messages")
+        else:
+            logger.warning(f"⚠️ LLM processing failed or returned empty result")
     
     async def batch_processor_task(self) -> None:
-        """Background task to process message batches every 2 minutes"""
+        """Background task to flush the batch when any flush trigger fires"""
         while True:
             try:
-                await asyncio.sleep(10)  # Check every 10 seconds
-                
-                current_time = asyncio.get_event_loop().time()
-                if current_time - self.last_batch_time >= self.batch_interval:
-                    await self.send_batch()
-                    
+                reason = await self.flush_controller.wait()
+                logger.info(f"⏰ Batch flush triggered by {reason}")
+                await self.send_batch()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"❌ Error in batch processor: {e}")
                 await asyncio.sleep(10)
@@ -188,18 +448,61 @@ class ChannelMonitor:
         self.background_tasks.append(heartbeat_task)
         batch_task = asyncio.create_task(self.batch_processor_task())
         self.background_tasks.append(batch_task)
+        delivery_task = asyncio.create_task(self.delivery_queue.drain_task())
+        self.background_tasks.append(delivery_task)
+        self.background_tasks.extend(self.llm_pipeline.start())
+        wal_task = asyncio.create_task(self.batch_wal.writer_task())
+        self.background_tasks.append(wal_task)
+        checkpoint_task = asyncio.create_task(self.checkpoint_task())
+        self.background_tasks.append(checkpoint_task)
+        watchlist_task = asyncio.create_task(self.watchlist.watch_task(Config.WATCHLIST_RELOAD_INTERVAL))
+        self.background_tasks.append(watchlist_task)
+        if Config.BACKFILL_HOURS > 0:
+            backfill_task = asyncio.create_task(self.backfill_task(Config.BACKFILL_HOURS))
+            self.background_tasks.append(backfill_task)
         logger.info("Background tasks started")
 
+    async def backfill_task(self, hours: float) -> None:
+        """Pull recent history of newly added channels into the batch (cold start)"""
+        try:
+            backfill = HistoryBackfill(
+                self.telegram_client.get_client(),
+                self.gap_handler.rate_limiter,
+                concurrency=Config.BACKFILL_CONCURRENCY
+            )
+            await backfill.run(self.telegram_client.get_target_channels(), hours, self.process_message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ History backfill failed: {e}")
+
     async def polling_task(self) -> None:
-        """Background polling task"""
+        """Background polling task: start each channel's poll as it falls due"""
         while True:
             try:
-                await self.gap_handler.fill_gap()
-                await asyncio.sleep(Config.POLLING_INTERVAL)
+                self.gap_handler.fill_gap()
+                await self.gap_handler.wait_until_due(Config.POLLING_INTERVAL)
+            except asyncio.CancelledError:
+                self.gap_handler.cancel_polls()
+                raise
             except Exception as e:
                 logger.error(f"Polling error: {e}")
                 await asyncio.sleep(10)
 
+    async def checkpoint_task(self) -> None:
+        """Background task writing pts checkpoints in batches"""
+        checkpoints = self.telegram_client.get_pts_checkpoints()
+        while True:
+            try:
+                await asyncio.sleep(Config.PTS_CHECKPOINT_INTERVAL)
+                # Messages covered by a checkpoint must be on disk before the checkpoint is
+                await self.batch_wal.commit()
+                checkpoints.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error writing pts checkpoints: {e}")
+
     async def heartbeat_task(self) -> None:
         """Background heartbeat task"""
         while True:
@@ -215,13 +518,13 @@ class ChannelMonitor:
     async def start_monitoring(self) -> None:
         """Start monitoring all channels"""
         try:
-            # Send test message to bot
+            # Warm up the bot HTTP pool and send test message
+            started = time.perf_counter()
+            await self.bot_forwarder.start()
             await self.bot_forwarder.send_test_message()
+            self.startup_times['test send'] = time.perf_counter() - started
+            logger.info("⏱️ Startup: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.startup_times.items()))
             
-            # Setup event handlers
-            channel_ids = self.telegram_client.get_channel_ids()
-            self.event_handler.register_message_handler(self.process_message)
-            self.event_handler.install_handlers(channel_ids)
             # Start background tasks
             await self.start_background_tasks()
             # Start monitoring
@@ -237,5 +540,9 @@ class ChannelMonitor:
         """Cleanup resources"""
         for task in self.background_tasks:
             task.cancel()
+        await self.bot_forwarder.close()
+        await self.batch_wal.close()
+        self.telegram_client.get_pts_checkpoints().flush()
+        self.delivery_queue.close()
         await self.telegram_client.disconnect()
         logger.info("Channel monitor cleaned up") 
\ No newline at end of file
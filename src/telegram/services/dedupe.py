@@ -0,0 +1,179 @@
+"""
+Near-duplicate story detection with SimHash fingerprints
+"""
+import hashlib
+import re
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from src.utils.logger import get_logger
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = get_logger(__name__)
+
+_WORD_RE = re.compile(r'\w+')
+
+# Filler words and wire-style prefixes that differ between reposts of the same story
+STOP_WORDS = frozenset(
+    "a an the of to in on for and or is are was were be by with as at from that this it its "
+    "will just breaking says said new".split()
+)
+
+# Messages with fewer distinct words than this are too short to fingerprint reliably
+MIN_WORDS = 4
+
+# Texts with at least this many distinct words are matched at the full max_distance. Shorter
+# ones get proportionally less: one changed word moves a short headline's fingerprint as far
+# as a reworded long story ("Fed cuts/raises interest rates by 25 bps" are 8 bits apart)
+FULL_DISTANCE_WORDS = 16
+
+def _feature_hashes(text: str) -> List[int]:
+    """64-bit hashes of the distinct non-stop words of text
+
+    Headlines are short, so word-set features are far more stable across
+    reposts than shingles (one added prefix changes very few features).
+    """
+    words = set(_WORD_RE.findall(text.lower())) - STOP_WORDS
+    if len(words) < MIN_WORDS:
+        return []
+    return [
+        int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), 'little')
+        for word in words
+    ]
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash of text, or None if the text is too short"""
+    return _simhash(_feature_hashes(text))
+
+def _simhash(hashes: List[int]) -> Optional[int]:
+    """SimHash of precomputed feature hashes"""
+    if not hashes:
+        return None
+
+    if np is not None:
+        bits = np.unpackbits(np.array(hashes, dtype=np.uint64).view(np.uint8)).reshape(-1, 64)
+        votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(hashes)
+        return int(np.packbits(votes).view(np.uint64)[0])
+
+    fingerprint = 0
+    for bit in range(64):
+        mask = 1 << bit
+        if sum(1 if h & mask else -1 for h in hashes) > 0:
+            fingerprint |= mask
+    return fingerprint
+
+class NearDuplicateDetector:
+    """Rolling-window SimHash index of recently seen stories
+
+    Fingerprints live in a fixed-size ring buffer (a NumPy uint64 array when
+    NumPy is installed), so checking a message against the whole window is a
+    single XOR + popcount over the array. Each fingerprint carries an optional
+    payload, the pending batch entry it represents; payloads are released
+    when the batch is flushed so later copies are dropped as already sent.
+    Pending entries are also indexed by key, so a deleted or edited message
+    can take its fingerprint back out of the window.
+    """
+
+    def __init__(self, window_seconds: float = 24 * 3600, max_distance: int = 6, capacity: int = 65536):
+        self.window = window_seconds
+        self.max_distance = max_distance
+        self.capacity = capacity
+        self.payloads: List[Any] = [None] * capacity
+        # Key of each pending payload -> its slot, and the reverse
+        self.slots: Dict[Hashable, int] = {}
+        self.slot_keys: List[Optional[Hashable]] = [None] * capacity
+        self.next_slot = 0
+
+        if np is not None:
+            self.fingerprints = np.zeros(capacity, dtype=np.uint64)
+            self.seen_at = np.full(capacity, -np.inf)
+            self._popcount = getattr(np, 'bitwise_count', None)
+            if self._popcount is None:
+                table = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+                self._popcount = lambda x: table[x.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+        else:
+            self.fingerprints = [0] * capacity
+            self.seen_at = [float('-inf')] * capacity
+
+        # Dedupe statistics
+        self.seen = 0
+        self.duplicates = 0
+        self.tokens_saved = 0
+
+    def max_distance_for(self, words: int) -> int:
+        """Largest Hamming distance still counted as a match for a text of `words` distinct words"""
+        return self.max_distance * min(words, FULL_DISTANCE_WORDS) // FULL_DISTANCE_WORDS
+
+    def find(self, text: str, now: Optional[float] = None) -> Tuple[Optional[int], Optional[int]]:
+        """Fingerprint text and look for a near-duplicate in the window
+
+        Returns:
+            (fingerprint, matching slot) - fingerprint is None for texts too
+            short to fingerprint, slot is None when nothing matched
+        """
+        self.seen += 1
+        hashes = _feature_hashes(text) if text else []
+        fingerprint = _simhash(hashes)
+        if fingerprint is None:
+            return None, None
+        max_distance = self.max_distance_for(len(hashes))
+
+        cutoff = (time.time() if now is None else now) - self.window
+        if np is not None:
+            distances = self._popcount(np.bitwise_xor(self.fingerprints, np.uint64(fingerprint)))
+            candidates = np.flatnonzero((distances <= max_distance) & (self.seen_at >= cutoff))
+            if candidates.size == 0:
+                return fingerprint, None
+            return fingerprint, int(candidates[np.argmin(distances[candidates])])
+
+        best_slot, best_distance = None, max_distance + 1
+        for slot, (other, seen_at) in enumerate(zip(self.fingerprints, self.seen_at)):
+            if seen_at >= cutoff:
+                distance = (other ^ fingerprint).bit_count()
+                if distance < best_distance:
+                    best_slot, best_distance = slot, distance
+        return fingerprint, best_slot
+
+    def add(self, fingerprint: Optional[int], payload: Any = None, now: Optional[float] = None,
+            key: Optional[Hashable] = None) -> None:
+        """Store a fingerprint (overwriting the oldest slot when full)"""
+        if fingerprint is None:
+            return
+        slot = self.next_slot
+        old_key = self.slot_keys[slot]
+        if old_key is not None and self.slots.get(old_key) == slot:
+            del self.slots[old_key]
+        self.fingerprints[slot] = fingerprint
+        self.seen_at[slot] = time.time() if now is None else now
+        self.payloads[slot] = payload
+        self.slot_keys[slot] = key
+        if key is not None:
+            self.slots[key] = slot
+        self.next_slot = (slot + 1) % self.capacity
+
+    def discard(self, key: Hashable) -> None:
+        """Take a pending entry's fingerprint out of the window (message deleted or edited)"""
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return
+        self.seen_at[slot] = float('-inf')
+        self.payloads[slot] = None
+        self.slot_keys[slot] = None
+
+    def record_duplicate(self, tokens: int) -> None:
+        """Count a dropped or merged copy"""
+        self.duplicates += 1
+        self.tokens_saved += tokens
+
+    def release_payloads(self) -> None:
+        """Forget pending batch entries after a flush (fingerprints stay in the window)"""
+        self.payloads = [None] * self.capacity
+        self.slots = {}
+        self.slot_keys = [None] * self.capacity
+
+    def report(self) -> str:
+        """Human-readable dedupe statistics"""
+        ratio = self.duplicates / self.seen if self.seen else 0.0
+        return f"{self.duplicates}/{self.seen} duplicates ({ratio:.1%}), ~{self.tokens_saved} LLM tokens saved"
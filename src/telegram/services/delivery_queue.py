@@ -0,0 +1,231 @@
+"""
+Durable outbound delivery queue for the bot forwarder
+"""
+import asyncio
+import hashlib
+import random
+import sqlite3
+import time
+from typing import Container, Dict, Iterable, List, Optional, Tuple
+from src.telegram.services.bot_forwarder import BotForwarder, SendPriority
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL,
+    target_id TEXT NOT NULL,
+    channel_handle TEXT NOT NULL,
+    text TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (idempotency_key, target_id)
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, target_id, priority, id);
+"""
+
+class DeliveryQueue:
+    """SQLite (WAL) backed outbox with at-least-once delivery
+
+    Every chunk is stored once per target under an idempotency key, so the
+    same content is never queued twice. A background drain task keeps one
+    send in flight per target: the head of the target's queue (ordered by
+    priority, then insertion). Each target's next head is picked as soon as
+    its own send completes, so an alert only ever waits behind its own
+    chat's current send, never behind a slow or rate-limited other target.
+    Failures are retried with exponential backoff. Rows survive restarts
+    until they are delivered or exhaust their attempts.
+    """
+
+    def __init__(self, path: str, forwarder: BotForwarder, max_attempts: int = 10,
+                 retry_base: float = 2, retry_max: float = 300, retention_hours: float = 24):
+        self.path = path
+        self.forwarder = forwarder
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.retention = retention_hours * 3600
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+
+        self._wakeup = asyncio.Event()
+
+        # Throughput counters for the current drain run
+        self.delivered = 0
+        self.failed = 0
+        self._run_started: Optional[float] = None
+        self._run_delivered = 0
+
+        pending = self.pending_count()
+        if pending:
+            logger.info(f"📬 Delivery queue restored {pending} pending message(s) from {path}")
+
+    def pending_count(self) -> int:
+        """Number of undelivered rows"""
+        return self.db.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def enqueue(self, channel_handle: str, chunks: Iterable[str], priority: int = SendPriority.DIGEST,
+                idempotency_key: Optional[str] = None) -> int:
+        """Persist a (possibly multi-chunk) message for every target
+
+        Args:
+            channel_handle: Label passed through to the forwarder
+            chunks: Message parts, delivered in order
+            priority: SendPriority lane
+            idempotency_key: Stable key for this message; defaults to a hash of its content
+
+        Returns:
+            Number of new rows queued (0 if the key was already queued)
+        """
+        if not self.forwarder.enabled:
+            return 0
+
+        chunks = list(chunks)
+        if idempotency_key is None:
+            digest = hashlib.sha256(channel_handle.encode())
+            for chunk in chunks:
+                digest.update(chunk.encode())
+            idempotency_key = digest.hexdigest()
+
+        now = time.time()
+        rows = [
+            (f"{idempotency_key}:{index}", target_id, channel_handle, chunk, int(priority), now, now)
+            for index, chunk in enumerate(chunks)
+            for target_id in self.forwarder.targets
+        ]
+        with self.db:
+            before = self.db.total_changes
+            self.db.executemany(
+                "INSERT OR IGNORE INTO outbox "
+                "(idempotency_key, target_id, channel_handle, text, priority, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            queued = self.db.total_changes - before
+
+        if queued:
+            logger.info(f"📥 Queued {len(chunks)} chunk(s) from {channel_handle} for {len(self.forwarder.targets)} target(s)")
+            self._wakeup.set()
+        else:
+            logger.info(f"🔁 Skipped duplicate message from {channel_handle} (key {idempotency_key[:12]})")
+        return queued
+
+    def _due_heads(self, now: float, busy: Container[str] = ()) -> Tuple[List[tuple], Optional[float]]:
+        """Head row of each idle target's queue that is due now, plus the next due time"""
+        heads = []
+        next_due = None
+        targets = [row[0] for row in self.db.execute(
+            "SELECT DISTINCT target_id FROM outbox WHERE status = 'pending'"
+        )]
+        for target_id in targets:
+            if target_id in busy:
+                # Its head is being sent; the next one is picked when that finishes
+                continue
+            row = self.db.execute(
+                "SELECT id, target_id, channel_handle, text, priority, attempts, next_attempt_at "
+                "FROM outbox WHERE status = 'pending' AND target_id = ? "
+                "ORDER BY priority, id LIMIT 1",
+                (target_id,)
+            ).fetchone()
+            if row is None:
+                continue
+            if row[6] <= now:
+                heads.append(row)
+            else:
+                next_due = row[6] if next_due is None else min(next_due, row[6])
+        return heads, next_due
+
+    async def _deliver(self, row: tuple) -> None:
+        """Send one row and record the outcome"""
+        row_id, target_id, channel_handle, text, priority, attempts, _ = row
+        ok = await self.forwarder.send_to_target(target_id, channel_handle, text, priority)
+
+        with self.db:
+            if ok:
+                self.db.execute("UPDATE outbox SET status = 'delivered' WHERE id = ?", (row_id,))
+                self.delivered += 1
+                self._run_delivered += 1
+                return
+
+            attempts += 1
+            if attempts >= self.max_attempts:
+                self.db.execute("UPDATE outbox SET status = 'failed', attempts = ? WHERE id = ?", (attempts, row_id))
+                self.failed += 1
+                logger.error(f"❌ Giving up on message {row_id} to {target_id} after {attempts} attempts")
+                return
+
+            backoff = min(self.retry_max, self.retry_base * (2 ** (attempts - 1)))
+            backoff *= random.uniform(0.8, 1.2)
+            self.db.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ? WHERE id = ?",
+                (attempts, time.time() + backoff, row_id)
+            )
+            logger.warning(f"⚠️ Delivery of message {row_id} to {target_id} failed (attempt {attempts}), retrying in {backoff:.1f}s")
+
+    def _purge(self) -> None:
+        """Drop finished rows older than the retention window (keys stay deduplicated until then)"""
+        with self.db:
+            self.db.execute(
+                "DELETE FROM outbox WHERE status != 'pending' AND created_at < ?",
+                (time.time() - self.retention,)
+            )
+
+    async def drain_task(self) -> None:
+        """Background task delivering queued messages, one send in flight per target"""
+        self._purge()
+        in_flight: Dict[str, asyncio.Task] = {}
+        while True:
+            try:
+                self._wakeup.clear()
+                heads, next_due = self._due_heads(time.time(), busy=in_flight)
+
+                for row in heads:
+                    if self._run_started is None:
+                        self._run_started = time.monotonic()
+                        self._run_delivered = 0
+                    in_flight[row[1]] = asyncio.create_task(self._deliver(row))
+
+                if not in_flight and self._run_started is not None and next_due is None:
+                    elapsed = time.monotonic() - self._run_started
+                    rate = self._run_delivered / elapsed if elapsed > 0 else 0.0
+                    logger.info(f"📤 Delivery queue drained: {self._run_delivered} sent in {elapsed:.2f}s ({rate:.1f} msg/s)")
+                    self._run_started = None
+                    self._purge()
+
+                # Wake up on new rows, when any target's send finishes, or when a retry falls due
+                timeout = None if next_due is None else max(0.0, next_due - time.time())
+                wakeup = asyncio.create_task(self._wakeup.wait())
+                try:
+                    await asyncio.wait([wakeup, *in_flight.values()], timeout=timeout,
+                                       return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    wakeup.cancel()
+
+                failure = None
+                for target_id, task in list(in_flight.items()):
+                    if task.done():
+                        del in_flight[target_id]
+                        failure = failure or task.exception()
+                if failure is not None:
+                    raise failure
+
+            except asyncio.CancelledError:
+                for task in in_flight.values():
+                    task.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error in delivery queue drain: {e}")
+                await asyncio.sleep(5)
+
+    def close(self) -> None:
+        """Close the database"""
+        self.db.close()
@@ -0,0 +1,154 @@
+"""
+Bounded ingest queue between Telethon update callbacks and processing
+"""
+import asyncio
+import bisect
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, List, Optional
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+OVERFLOW_POLICIES = ('block', 'drop_newest', 'drop_oldest')
+
+@dataclass(slots=True)
+class IngestRecord:
+    """One live update waiting to be processed"""
+    kind: str
+    channel_id: int
+    payload: Any
+    pts: Optional[int] = None
+    pts_count: Optional[int] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in milliseconds"""
+
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.total = 0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.total += 1
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound (ms) of the bucket holding the q-th percentile"""
+        if not self.total:
+            return 0.0
+        rank = q * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.BOUNDS_MS[index] if index < len(self.BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def summary(self) -> str:
+        return (f"p50<={self.percentile(0.5):g}ms p95<={self.percentile(0.95):g}ms "
+                f"p99<={self.percentile(0.99):g}ms max={self.max_ms:.1f}ms")
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.total = 0
+        self.max_ms = 0.0
+
+class IngestQueue:
+    """Hand live updates from Telethon callbacks to a pool of consumers
+
+    Records are sharded by channel id over one bounded queue per consumer,
+    so each channel is processed strictly in arrival order while different
+    channels proceed in parallel. When a shard is full the overflow policy
+    decides: 'block' makes the callback wait, 'drop_newest' discards the
+    incoming record and 'drop_oldest' evicts the oldest queued one. A dropped
+    message leaves a pts gap that gap filling recovers.
+    
+    'block' only bounds memory if the client dispatches updates sequentially
+    (`sequential_updates=True`): then a waiting callback holds back Telethon's
+    update loop. With concurrent dispatch every waiting callback is one more
+    task, and those are not bounded.
+    """
+
+    def __init__(self, handler: Callable[[IngestRecord], Awaitable[None]], consumers: int = 4,
+                 max_size: int = 10000, overflow_policy: str = 'block', report_interval: float = 60):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown ingest overflow policy {overflow_policy!r}, expected one of {OVERFLOW_POLICIES}")
+        self.handler = handler
+        self.overflow_policy = overflow_policy
+        self.report_interval = report_interval
+        consumers = max(1, consumers)
+        shard_size = max(1, max_size // consumers)
+        self.shards: List[asyncio.Queue] = [asyncio.Queue(maxsize=shard_size) for _ in range(consumers)]
+
+        # Statistics
+        self.queue_wait = LatencyHistogram()
+        self.processing = LatencyHistogram()
+        self.processed = 0
+        self.dropped = 0
+
+    def depth(self) -> int:
+        """Records waiting across all shards"""
+        return sum(shard.qsize() for shard in self.shards)
+
+    async def put(self, record: IngestRecord) -> None:
+        """Queue a record, applying the overflow policy if its shard is full"""
+        shard = self.shards[record.channel_id % len(self.shards)]
+        if not shard.full():
+            shard.put_nowait(record)
+            return
+
+        if self.overflow_policy == 'block':
+            await shard.put(record)
+        elif self.overflow_policy == 'drop_newest':
+            self._drop(record)
+        else:
+            self._drop(shard.get_nowait())
+            shard.task_done()
+            shard.put_nowait(record)
+
+    def _drop(self, record: IngestRecord) -> None:
+        self.dropped += 1
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            logger.warning(f"⚠️ Ingest queue full ({self.overflow_policy}): dropped {self.dropped} records so far, "
+                           f"latest from channel {record.channel_id}")
+
+    async def _consumer(self, shard: asyncio.Queue) -> None:
+        """Process one shard's records in order"""
+        while True:
+            record = await shard.get()
+            started = time.monotonic()
+            self.queue_wait.observe(started - record.enqueued_at)
+            try:
+                await self.handler(record)
+            except Exception as e:
+                logger.error(f"❌ Error processing {record.kind} from channel {record.channel_id}: {e}")
+            finally:
+                self.processing.observe(time.monotonic() - started)
+                self.processed += 1
+                shard.task_done()
+
+    def report(self) -> str:
+        """Queue depth, drops and latency histograms"""
+        return (f"processed {self.processed}, depth {self.depth()}, dropped {self.dropped}; "
+                f"queue wait {self.queue_wait.summary()}; processing {self.processing.summary()}")
+
+    async def _reporter(self) -> None:
+        """Log the histograms periodically, then start a fresh window"""
+        while True:
+            await asyncio.sleep(self.report_interval)
+            if self.queue_wait.total:
+                logger.info(f"📥 Ingest: {self.report()}")
+                self.queue_wait.reset()
+                self.processing.reset()
+
+    def start(self) -> List[asyncio.Task]:
+        """Start the consumer and reporter tasks"""
+        tasks = [asyncio.create_task(self._consumer(shard)) for shard in self.shards]
+        tasks.append(asyncio.create_task(self._reporter()))
+        return tasks
@@ -0,0 +1,81 @@
+"""
+Pipelined LLM summarization stage
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+from src.telegram.services.batched_message import BatchedMessage
+from src.telegram.services.llm_processor import process_batch_with_llm
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class LLMPipeline:
+    """Run LLM summarization behind a bounded queue with a pool of workers
+
+    submit() returns as soon as the batch is queued; it only waits when the
+    queue is full, which applies backpressure to the batch flusher instead of
+    letting summaries pile up in memory. Each job reports how long it waited
+    in the queue and how long the LLM call took.
+    """
+
+    def __init__(self, on_result: Callable[[List[BatchedMessage], Any], Awaitable[None]],
+                 workers: int = 1, max_queue: int = 4):
+        self.on_result = on_result
+        self.workers = max(1, workers)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_queue))
+
+        # Stage statistics
+        self.processed = 0
+        self.total_wait = 0.0
+        self.total_service = 0.0
+
+    def depth(self) -> int:
+        """Number of batches waiting for a worker"""
+        return self.queue.qsize()
+
+    async def submit(self, batch_messages: List[BatchedMessage], combined_text: Optional[str] = None,
+                     on_done: Optional[Callable[[], None]] = None) -> None:
+        """Queue a batch for summarization (waits only if the queue is full)
+        
+        on_done is called once the batch was summarized and its result handed
+        on. A batch that failed or was cancelled at shutdown never calls it, so
+        its write-ahead log survives for a restart to replay.
+        """
+        if self.queue.full():
+            logger.warning(f"⏳ LLM queue full ({self.queue.maxsize}), waiting for a free slot")
+        await self.queue.put((batch_messages, combined_text, on_done, time.monotonic()))
+        logger.info(f"🧠 Queued batch of {len(batch_messages)} messages for LLM (queue depth: {self.depth()})")
+
+    async def _worker(self, worker_id: int) -> None:
+        """Take batches off the queue and summarize them"""
+        while True:
+            batch_messages, combined_text, on_done, queued_at = await self.queue.get()
+            started = time.monotonic()
+            completed = False
+            try:
+                llm_result = await process_batch_with_llm(batch_messages, combined_text=combined_text)
+                await self.on_result(batch_messages, llm_result)
+                completed = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error in LLM worker {worker_id}: {e}")
+            finally:
+                finished = time.monotonic()
+                wait, service = started - queued_at, finished - started
+                self.processed += 1
+                self.total_wait += wait
+                self.total_service += service
+                self.queue.task_done()
+                if completed and on_done is not None:
+                    on_done()
+                logger.info(
+                    f"🧠 LLM worker {worker_id} finished batch of {len(batch_messages)} messages "
+                    f"(wait: {wait:.2f}s, service: {service:.2f}s, queue depth: {self.depth()}, "
+                    f"avg wait: {self.total_wait / self.processed:.2f}s, avg service: {self.total_service / self.processed:.2f}s)"
+                )
+
+    def start(self) -> List[asyncio.Task]:
+        """Start the worker tasks"""
+        return [asyncio.create_task(self._worker(i)) for i in range(1, self.workers + 1)]
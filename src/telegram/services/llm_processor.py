@@ -1,6 +1,8 @@
 from workers.llm_process import LLMProcess, PromptType, LLMConfig
-from typing import List, Dict, Any
+from typing import List
 import re
+from src.telegram.services.batch_renderer import BatchRenderer
+from src.telegram.services.batched_message import BatchedMessage
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -27,29 +29,23 @@ def clean_telegram_formatting(text: str) -> str:
     text = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', text)
     return text
 
-async def process_batch_with_llm(batch_messages: List[Dict[str, Any]], prompt: str = None) -> str:
+async def process_batch_with_llm(batch_messages: List[BatchedMessage], prompt: str = None,
+                                 combined_text: str = None) -> str:
     """
     Process batched messages with LLM
     
     Args:
-        batch_messages: List of message dictionaries with 'channel_handle', 'message_text', 'urls'
+        batch_messages: List of BatchedMessage records
         prompt: Custom prompt to use (optional)
+        combined_text: Pre-rendered LLM view of the batch (optional, rendered here if omitted)
     
     Returns:
         Processed text from LLM
     """
     try:
         # Combine all messages into one text
-        combined_text = "Batched Messages:\n\n"
-        for i, msg in enumerate(batch_messages, 1):
-            channel = msg.get('channel_handle', 'unknown')
-            text = msg.get('message_text', '')
-            urls = msg.get('urls', [])
-            
-            combined_text += f"{i}. @{channel}: {text}\n"
-            if urls:
-                combined_text += f"   Links: {', '.join(urls)}\n"
-            combined_text += "\n"
+        if combined_text is None:
+            combined_text = BatchRenderer(batch_messages).llm_text
         
         # Use enhanced expert prompt if none provided
         if not prompt:
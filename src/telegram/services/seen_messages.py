@@ -0,0 +1,49 @@
+"""
+Exactly-once ingestion tracking for channel messages
+"""
+from typing import Dict
+
+class SeenMessageSet:
+    """Bounded record of which (channel_id, message_id) pairs were ingested
+
+    Telegram message ids grow monotonically per channel, so each channel
+    keeps a high-water mark plus a sliding bitmap of the `window` ids just
+    below it (bit i set = id hwm - i was seen). Out-of-order ids that arrive
+    late, e.g. from gap filling after a newer live event, are tracked
+    exactly inside the window; anything older than the window is treated as
+    already seen. Checks are O(1) and memory is `window` bits per channel,
+    no matter how long the process runs.
+    """
+
+    def __init__(self, window: int = 4096):
+        self.window = window
+        self._mask = (1 << window) - 1
+        self.high_water: Dict[int, int] = {}
+        self.seen_bits: Dict[int, int] = {}
+
+    def check_and_add(self, channel_id: int, message_id: int) -> bool:
+        """Mark a message as seen; return True if it had not been seen before"""
+        hwm = self.high_water.get(channel_id)
+        if hwm is None:
+            self.high_water[channel_id] = message_id
+            self.seen_bits[channel_id] = 1
+            return True
+
+        if message_id > hwm:
+            # Slide the window forward
+            shift = message_id - hwm
+            bits = self.seen_bits[channel_id]
+            self.seen_bits[channel_id] = ((bits << shift) | 1) & self._mask if shift < self.window else 1
+            self.high_water[channel_id] = message_id
+            return True
+
+        offset = hwm - message_id
+        if offset >= self.window:
+            return False
+
+        bit = 1 << offset
+        bits = self.seen_bits[channel_id]
+        if bits & bit:
+            return False
+        self.seen_bits[channel_id] = bits | bit
+        return True
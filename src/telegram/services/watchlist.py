@@ -0,0 +1,144 @@
+"""
+Watchlist matching for immediate alerts
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class AhoCorasick:
+    """Immutable Aho-Corasick automaton over case-insensitive terms
+
+    Scanning is a single pass over the text whatever the number of terms.
+    A match only counts on word boundaries, so "ETH" does not fire inside
+    "method"; terms that start or end with punctuation (e.g. "$PEPE") are
+    bounded on that side by the punctuation itself.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # Per state: (term as written, length) of every term ending here
+        self.outputs: List[Tuple[Tuple[str, int], ...]] = [()]
+        self.size = 0
+
+        for term in terms:
+            key = term.strip().lower()
+            if not key:
+                continue
+            state = 0
+            for char in key:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append(())
+                state = next_state
+            if not any(length == len(key) for _, length in self.outputs[state]):
+                self.outputs[state] += ((term.strip(), len(key)),)
+                self.size += 1
+
+        # Breadth-first: failure links point at the longest proper suffix that is also a prefix
+        # (depth-1 states keep their link to the root)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.outputs[next_state] += self.outputs[self.fail[next_state]]
+
+    def find(self, text: Optional[str]) -> List[str]:
+        """Distinct terms found in text, in order of first appearance"""
+        if not text or not self.size:
+            return []
+
+        text = text.lower()
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found: Dict[str, None] = {}
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for term, length in outputs[state]:
+                start = index - length + 1
+                if text[start].isalnum() and start > 0 and text[start - 1].isalnum():
+                    continue
+                if char.isalnum() and index + 1 < len(text) and text[index + 1].isalnum():
+                    continue
+                found[term] = None
+        return list(found)
+
+class Watchlist:
+    """Watchlist terms from a file, compiled into an Aho-Corasick automaton
+
+    The file holds one keyword, ticker or name per line ('#' starts a
+    comment). When it changes, a new automaton is built off the event loop
+    and swapped in with a single assignment, so scans never see a
+    half-built one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.automaton = AhoCorasick(())
+        self._signature: Optional[Tuple[float, int]] = None
+        self.reload_if_changed()
+
+    @staticmethod
+    def load_terms(path: str) -> List[str]:
+        terms = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                term = line.split('#', 1)[0].strip()
+                if term:
+                    terms.append(term)
+        return terms
+
+    def reload_if_changed(self) -> bool:
+        """Rebuild the automaton if the file changed; returns True if it was rebuilt"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._signature is not None:
+                logger.warning(f"Watchlist {self.path} was removed, keeping the last loaded terms")
+            return False
+
+        signature = (stat.st_mtime, stat.st_size)
+        if signature == self._signature:
+            return False
+
+        started = time.perf_counter()
+        try:
+            automaton = AhoCorasick(self.load_terms(self.path))
+        except Exception as e:
+            logger.error(f"❌ Could not load watchlist {self.path}, keeping the previous one: {e}")
+            return False
+        self.automaton = automaton
+        self._signature = signature
+        logger.info(f"👀 Loaded watchlist with {automaton.size} terms in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return True
+
+    def scan(self, text: Optional[str]) -> List[str]:
+        """Watchlist terms found in text"""
+        return self.automaton.find(text)
+
+    async def watch_task(self, interval: float) -> None:
+        """Background task reloading the watchlist when its file changes"""
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(self.reload_if_changed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error reloading watchlist: {e}")
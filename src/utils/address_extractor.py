@@ -0,0 +1,126 @@
+"""
+Crypto address and ticker extraction for message text
+"""
+import re
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, List, Optional
+from src.utils.logger import get_logger
+
+try:
+    from Crypto.Hash import keccak
+except ImportError:
+    keccak = None
+
+logger = get_logger(__name__)
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+_BASE58_INDEX = {char: index for index, char in enumerate(BASE58_ALPHABET)}
+
+# One pass finds all three kinds; the alternation order makes 0x... win over base58
+SYMBOL_PATTERN = re.compile(
+    r'(?<![0-9A-Za-z$])(?:'
+    r'(?P<evm>0x[0-9a-fA-F]{40})'
+    r'|\$(?P<tickers>[A-Za-z][A-Za-z0-9]{1,9})'
+    r'|(?P<solana>[1-9A-HJ-NP-Za-km-z]{32,44})'
+    r')(?![0-9A-Za-z])'
+)
+
+@dataclass(slots=True)
+class ExtractedSymbols:
+    """Addresses and cashtags found in one message, in order of appearance"""
+    solana: List[str] = field(default_factory=list)
+    evm: List[str] = field(default_factory=list)
+    tickers: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.solana or self.evm or self.tickers)
+
+@lru_cache(maxsize=16384)
+def is_solana_address(candidate: str) -> bool:
+    """Whether a base58 string decodes to a 32-byte public key"""
+    value = 0
+    for char in candidate:
+        index = _BASE58_INDEX.get(char)
+        if index is None:
+            return False
+        value = value * 58 + index
+    leading_zeros = len(candidate) - len(candidate.lstrip('1'))
+    return leading_zeros + (value.bit_length() + 7) // 8 == 32
+
+@lru_cache(maxsize=16384)
+def is_evm_checksum_valid(address: str) -> bool:
+    """EIP-55 check for mixed-case addresses
+
+    All-lowercase and all-uppercase addresses carry no checksum and pass.
+    Without a Keccak implementation (pycryptodome) the check is skipped.
+    """
+    body = address[2:]
+    if body.islower() or body.isupper() or keccak is None:
+        return True
+    digest = keccak.new(digest_bits=256, data=body.lower().encode('ascii')).hexdigest()
+    return all(
+        (char.isupper() if int(nibble, 16) >= 8 else char.islower()) if char.isalpha() else True
+        for char, nibble in zip(body, digest)
+    )
+
+class AddressExtractor:
+    """Find Solana addresses, EVM addresses and $TICKER cashtags
+
+    A single pre-compiled regex scans each text once for all three kinds;
+    candidates are then validated cheaply (base58 decode length for Solana,
+    optional EIP-55 checksum for EVM) with per-candidate results cached,
+    since the same tokens are reposted across channels.
+    """
+
+    def __init__(self, verify_checksums: bool = True):
+        self.verify_checksums = verify_checksums
+
+    def extract(self, text: Optional[str]) -> ExtractedSymbols:
+        """Extract deduplicated symbols from one text"""
+        result = ExtractedSymbols()
+        if not text:
+            return result
+
+        seen = set()
+        for match in SYMBOL_PATTERN.finditer(text):
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == 'tickers':
+                value = value.upper()
+            elif kind == 'evm':
+                if self.verify_checksums and not is_evm_checksum_valid(value):
+                    continue
+                value = value.lower()
+            elif not is_solana_address(value):
+                continue
+
+            if (kind, value) in seen:
+                continue
+            seen.add((kind, value))
+            getattr(result, kind).append(value)
+        return result
+
+    def extract_batch(self, texts: Iterable[Optional[str]]) -> List[ExtractedSymbols]:
+        """Extract symbols from many texts at once, one result per text"""
+        started = time.perf_counter()
+        extract = self.extract
+        results = [extract(text) for text in texts]
+        elapsed = time.perf_counter() - started
+        if results:
+            logger.debug(f"Extracted symbols from {len(results)} messages in {elapsed * 1000:.1f}ms "
+                         f"({len(results) / max(elapsed, 1e-9):.0f} msg/s)")
+        return results
+
+    def extract_solana_addresses(self, text: Optional[str]) -> List[str]:
+        """Solana addresses in a text"""
+        return self.extract(text).solana
+
+    def extract_evm_addresses(self, text: Optional[str]) -> List[str]:
+        """EVM addresses in a text (lowercased)"""
+        return self.extract(text).evm
+
+    def extract_tickers(self, text: Optional[str]) -> List[str]:
+        """$TICKER cashtags in a text (uppercased, without the $)"""
+        return self.extract(text).tickers
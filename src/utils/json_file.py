@@ -0,0 +1,37 @@
+"""
+Small JSON state files written atomically
+"""
+import json
+import os
+from typing import Any, Optional
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def load_json(path: str, description: str) -> Optional[Any]:
+    """Contents of a JSON state file, or None if it is missing or unreadable"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Could not load {description} {path}, starting empty: {e}")
+        return None
+
+def save_json_atomic(path: str, data: Any, description: str) -> bool:
+    """Write a JSON state file (temp file + fsync + rename); returns True on success
+
+    A crash leaves either the old or the new file, never a torn one.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        logger.warning(f"Could not save {description} {path}: {e}")
+        return False
@@ -0,0 +1,45 @@
+"""
+Token-bucket rate limiting
+"""
+import asyncio
+import time
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second"""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 if available now)"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    def consume(self, now: float) -> None:
+        """Take one token (caller must check wait_time first)"""
+        self._refill(now)
+        self.tokens -= 1
+
+class AsyncRateLimiter:
+    """Shared request budget: acquire() waits for a token, first come first served"""
+    
+    def __init__(self, rate: float, burst: float = 1):
+        self.bucket = TokenBucket(rate, max(1, burst))
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        """Wait until a request may be made"""
+        async with self._lock:
+            delay = self.bucket.wait_time(time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.bucket.consume(time.monotonic())
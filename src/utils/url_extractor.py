@@ -0,0 +1,121 @@
+"""
+URL extraction and canonicalization for Telegram messages
+"""
+import re
+from functools import lru_cache
+from typing import List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from telethon.tl.types import MessageEntityTextUrl, MessageEntityUrl
+
+URL_PATTERN = re.compile(r'https?://[^\s<>"]+')
+
+# Query parameters that only carry tracking information
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    'ref', 'ref_src', 'ref_url', 'si', 'cmpid', '_ga', 'yclid',
+})
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+_TRAILING_PUNCTUATION = '.,;:!?)]}\'"'
+_CLOSING_BRACKETS = {')': '(', ']': '[', '}': '{'}
+# A scheme prefix such as "mailto:", but not a "host:port"
+_SCHEME_RE = re.compile(r'^([a-zA-Z][a-zA-Z0-9+.-]*):(?!\d)')
+
+def _strip_trailing_punctuation(url: str) -> str:
+    """Drop sentence punctuation after a URL found in plain text
+
+    A closing bracket is kept when it balances one inside the URL, as in
+    https://en.wikipedia.org/wiki/Foo_(bar).
+    """
+    while url and url[-1] in _TRAILING_PUNCTUATION:
+        opening = _CLOSING_BRACKETS.get(url[-1])
+        if opening and url.count(opening) >= url.count(url[-1]):
+            break
+        url = url[:-1]
+    return url
+
+@lru_cache(maxsize=8192)
+def canonicalize_url(url: str) -> str:
+    """Return a canonical form of url, used as its deduplication key
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    query parameters (utm_* and friends). Links with a scheme other than
+    http(s), such as mailto: or tg:, are returned unchanged. The key is not
+    meant for display: query values are re-encoded along the way.
+    """
+    url = url.strip()
+    scheme_match = _SCHEME_RE.match(url)
+    if scheme_match and scheme_match.group(1).lower() not in _DEFAULT_PORTS:
+        return url
+    if '://' not in url:
+        url = f"https://{url}"
+
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if ':' in host:
+        # IPv6 literal
+        host = f"[{host}]"
+    if port and port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        host = f"{userinfo}@{host}"
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ]
+
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query, doseq=True), ''))
+
+def extract_urls_from_text(text: Optional[str]) -> List[str]:
+    """Extract URLs from plain text (regex fallback), in order of appearance
+
+    URLs with the same canonical form are kept once, as first written.
+    """
+    if not text:
+        return []
+    urls = {}
+    for url in URL_PATTERN.findall(text):
+        url = _strip_trailing_punctuation(url)
+        urls.setdefault(canonicalize_url(url), url)
+    return list(urls.values())
+
+def extract_urls(message) -> List[str]:
+    """Extract deduplicated URLs from a Telegram message, as written
+
+    URL entities are sliced out of the message text by their UTF-16 offsets
+    (Telegram counts offsets in UTF-16 code units), text links use their
+    target URL. Falls back to a regex scan when the message has no URL
+    entities. URLs are deduplicated by their canonical form.
+    """
+    text = getattr(message, 'message', None) or ''
+    entities = getattr(message, 'entities', None)
+    if not entities:
+        return extract_urls_from_text(text)
+
+    urls = {}
+    encoded = None
+    for entity in entities:
+        if isinstance(entity, MessageEntityTextUrl):
+            url = entity.url
+        elif isinstance(entity, MessageEntityUrl):
+            if encoded is None:
+                encoded = text.encode('utf-16-le')
+            start = entity.offset * 2
+            url = encoded[start:start + entity.length * 2].decode('utf-16-le', errors='ignore')
+        else:
+            continue
+
+        if url:
+            urls.setdefault(canonicalize_url(url), url.strip())
+
+    if not urls:
+        return extract_urls_from_text(text)
+    return list(urls.values())